@@ -1,7 +1,9 @@
 import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
 import os
+import sys
 
 # =======================================================
 # CONFIGURACIÓN
@@ -19,28 +21,33 @@ PLATO_MENU_INICIAL = [
         "nombre": "Hamburguesa Clásica",
         "precio": 15000,
         "descripcion": "Carne de res 150g, queso cheddar, lechuga, tomate y salsas.",
-        "categoria": "Platos Fuertes"
+        "categoria": "Platos Fuertes",
+        # Receta: insumo_id -> cantidad por plato vendido (con unidad; se convierte a la del insumo)
+        "insumos": {"pan_hamburguesa": "1 unidad", "carne_res": "150 g", "queso_cheddar": "30 g", "lechuga_romana": "20 g"}
     },
     {
         "id": "ensalada_cesar_con_pollo",
         "nombre": "Ensalada César con Pollo",
         "precio": 18000,
         "descripcion": "Lechuga romana, pechuga de pollo grillada, crutones, parmesano y aderezo.",
-        "categoria": "Ensaladas"
+        "categoria": "Ensaladas",
+        "insumos": {"lechuga_romana": "150 g", "pechuga_pollo": "120 g", "aderezo_cesar": "40 ml"}
     },
     {
         "id": "papas_fritas_medianas",
         "nombre": "Papas Fritas Medianas",
         "precio": 8000,
         "descripcion": "Porción de papas bastón crujientes con sal.",
-        "categoria": "Entradas"
+        "categoria": "Entradas",
+        "insumos": {"papas_baston": "200 g", "aceite_freir": "30 ml"}
     },
     {
         "id": "tacos_al_pastor_3_pzas",
         "nombre": "Tacos al Pastor (3 pzas)",
         "precio": 12000,
         "descripcion": "Tres tacos de cerdo marinado con piña, cilantro y cebolla.",
-        "categoria": "Platos Fuertes"
+        "categoria": "Platos Fuertes",
+        "insumos": {"tortillas_maiz": "3 unidad", "carne_cerdo_pastor": "120 g", "pina_fresca": "0.1 unidad"}
     },
 ]
 
@@ -48,21 +55,22 @@ PLATO_MENU_INICIAL = [
 # INVENTARIO
 # =======================================================
 
+# costo_unitario: precio de compra por 'unidad' del insumo (base del costo de cada plato)
 INVENTARIO_INICIAL = [
-    {"id": "pan_hamburguesa", "nombre": "Pan de Hamburguesa", "cantidad": 50.0, "unidad": "unidad", "minimo": 20},
-    {"id": "carne_res", "nombre": "Carne de Res Molida", "cantidad": 10.0, "unidad": "kg", "minimo": 5},
-    {"id": "queso_cheddar", "nombre": "Queso Cheddar", "cantidad": 2.0, "unidad": "kg", "minimo": 1},
+    {"id": "pan_hamburguesa", "nombre": "Pan de Hamburguesa", "cantidad": 50.0, "unidad": "unidad", "minimo": 20, "costo_unitario": 800},
+    {"id": "carne_res", "nombre": "Carne de Res Molida", "cantidad": 10.0, "unidad": "kg", "minimo": 5, "costo_unitario": 28000},
+    {"id": "queso_cheddar", "nombre": "Queso Cheddar", "cantidad": 2.0, "unidad": "kg", "minimo": 1, "costo_unitario": 32000},
 
-    {"id": "lechuga_romana", "nombre": "Lechuga Romana", "cantidad": 15.0, "unidad": "unidad", "minimo": 5},
-    {"id": "pechuga_pollo", "nombre": "Pechuga de Pollo", "cantidad": 8.0, "unidad": "kg", "minimo": 3},
-    {"id": "aderezo_cesar", "nombre": "Aderezo César", "cantidad": 3.0, "unidad": "lt", "minimo": 1},
+    {"id": "lechuga_romana", "nombre": "Lechuga Romana", "cantidad": 15.0, "unidad": "unidad", "minimo": 5, "costo_unitario": 2500, "conversiones": {"g": 400}},
+    {"id": "pechuga_pollo", "nombre": "Pechuga de Pollo", "cantidad": 8.0, "unidad": "kg", "minimo": 3, "costo_unitario": 22000},
+    {"id": "aderezo_cesar", "nombre": "Aderezo César", "cantidad": 3.0, "unidad": "lt", "minimo": 1, "costo_unitario": 18000},
 
-    {"id": "papas_baston", "nombre": "Papas Bastón Congeladas", "cantidad": 20.0, "unidad": "kg", "minimo": 10},
-    {"id": "aceite_freir", "nombre": "Aceite para Freír", "cantidad": 10.0, "unidad": "lt", "minimo": 5},
+    {"id": "papas_baston", "nombre": "Papas Bastón Congeladas", "cantidad": 20.0, "unidad": "kg", "minimo": 10, "costo_unitario": 9000},
+    {"id": "aceite_freir", "nombre": "Aceite para Freír", "cantidad": 10.0, "unidad": "lt", "minimo": 5, "costo_unitario": 12000},
 
-    {"id": "tortillas_maiz", "nombre": "Tortillas de Maíz", "cantidad": 100.0, "unidad": "unidad", "minimo": 50},
-    {"id": "carne_cerdo_pastor", "nombre": "Carne de Cerdo (Pastor)", "cantidad": 6.0, "unidad": "kg", "minimo": 2},
-    {"id": "pina_fresca", "nombre": "Piña Fresca", "cantidad": 3.0, "unidad": "unidad", "minimo": 1},
+    {"id": "tortillas_maiz", "nombre": "Tortillas de Maíz", "cantidad": 100.0, "unidad": "unidad", "minimo": 50, "costo_unitario": 150},
+    {"id": "carne_cerdo_pastor", "nombre": "Carne de Cerdo (Pastor)", "cantidad": 6.0, "unidad": "kg", "minimo": 2, "costo_unitario": 24000},
+    {"id": "pina_fresca", "nombre": "Piña Fresca", "cantidad": 3.0, "unidad": "unidad", "minimo": 1, "costo_unitario": 6000},
 ]
 
 # =======================================================
@@ -117,6 +125,40 @@ def cargar_datos(db, coleccion, lista_datos):
     batch.commit()
     print(f" {len(lista_datos)} items actualizados en '{coleccion}'.")
 
+# =======================================================
+# MIGRACIÓN: CLIENTES SIN ARREGLO 'historial_pedidos'
+# =======================================================
+
+def migrar_historial_clientes(db):
+    """Reemplaza el arreglo de IDs por contador + última visita (el historial vive en 'pedidos')."""
+    print("\n--- Migrando colección: 'clientes' ---")
+    migrados = 0
+    batch = db.batch()
+
+    for doc in db.collection("clientes").stream():
+        data = doc.to_dict()
+        if "historial_pedidos" not in data:
+            continue
+
+        ultimo = (db.collection("pedidos")
+                  .where(filter=FieldFilter("cliente_id", "==", doc.id))
+                  .order_by("creado_en", direction=firestore.Query.DESCENDING)
+                  .limit(1).get())
+        batch.update(doc.reference, {
+            # Un pedido hecho antes de migrar ya creó 'num_pedidos' (Increment): se suma al arreglo viejo
+            "num_pedidos": len(data["historial_pedidos"]) + data.get("num_pedidos", 0),
+            "ultima_visita": ultimo[0].to_dict().get("creado_en") if ultimo else None,
+            "historial_pedidos": firestore.DELETE_FIELD
+        })
+        migrados += 1
+
+        if migrados % 400 == 0:
+            batch.commit()
+            batch = db.batch()
+
+    batch.commit()
+    print(f" {migrados} clientes migrados.")
+
 # =======================================================
 # EJECUCIÓN PRINCIPAL
 # =======================================================
@@ -125,7 +167,16 @@ if __name__ == "__main__":
     print("Iniciando script de población de base de datos...")
     db = inicializar_firebase()
 
-    if db:
+    if db and "--reconstruir-resumenes" in sys.argv:
+        # Genera 'resumen_diario' para los pedidos guardados antes de los rollups
+        from data.firestore_service import FirestoreService
+        dias = FirestoreService(firestore_client=db, auth_client=None).reconstruir_resumenes_diarios()
+        print(f" {dias} resúmenes diarios reconstruidos en 'resumen_diario'.")
+
+    elif db and "--migrar-clientes" in sys.argv:
+        migrar_historial_clientes(db)
+
+    elif db:
 
         cargar_datos(db, "platos", PLATO_MENU_INICIAL)
         cargar_datos(db, "inventario", INVENTARIO_INICIAL)
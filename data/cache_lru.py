@@ -0,0 +1,62 @@
+# data/cache_lru.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+class CacheLRU:
+    """Caché en memoria con tamaño máximo (LRU) y vencimiento por tiempo (TTL)."""
+
+    def __init__(self, max_items: int = 500, ttl_segundos: float = 900):
+        self.max_items = max_items
+        self.ttl_segundos = ttl_segundos
+        self._datos: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            valor, vence = entrada
+            if vence < time.monotonic():
+                del self._datos[clave]
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def put(self, clave, valor, ttl_segundos: Optional[float] = None):
+        """'ttl_segundos' permite una vigencia menor (ej. entradas recuperadas de disco)."""
+        ttl = self.ttl_segundos if ttl_segundos is None else ttl_segundos
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_acierto": self.aciertos / consultas if consultas else 0.0,
+                "items": len(self._datos)
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._datos)
@@ -0,0 +1,86 @@
+# data/cache_respuestas_ia.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+from data.cache_lru import CacheLRU
+
+class CacheRespuestasIA:
+    """
+    Respuestas de Gemini ya generadas, por hash de (modelo, configuración, prompt).
+    Primero se busca en memoria (LRU); si no está, en SQLite, que sobrevive a reinicios.
+    Ambas capas respetan el mismo TTL y el mismo tamaño máximo.
+    """
+
+    def __init__(self, ruta: str = "respuestas_ia.db", max_items: int = 1000, ttl_segundos: float = 30 * 60):
+        self.max_items = max_items
+        self.ttl_segundos = ttl_segundos
+        self.memoria = CacheLRU(max_items=max_items, ttl_segundos=ttl_segundos)
+        self.aciertos = 0
+        self.fallos = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS respuestas (
+                clave TEXT PRIMARY KEY,
+                respuesta TEXT NOT NULL,
+                vence REAL NOT NULL,
+                usado REAL NOT NULL
+            )
+        """)
+        with self._lock:
+            self._conn.execute("DELETE FROM respuestas WHERE vence < ?", (time.time(),))
+
+    @staticmethod
+    def clave(prompt: str, modelo: str, config: dict) -> str:
+        texto = json.dumps({"modelo": modelo, "config": config, "prompt": prompt}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    def get(self, clave: str) -> Optional[str]:
+        respuesta = self.memoria.get(clave)
+        if respuesta is not None:
+            self.aciertos += 1
+            return respuesta
+
+        ahora = time.time()
+        with self._lock:
+            fila = self._conn.execute("SELECT respuesta, vence FROM respuestas WHERE clave = ?", (clave,)).fetchone()
+            if fila and fila[1] >= ahora:
+                self._conn.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (ahora, clave))
+        if not fila or fila[1] < ahora:
+            self.fallos += 1
+            return None
+
+        # Vuelve a memoria solo por el tiempo que le queda
+        self.memoria.put(clave, fila[0], ttl_segundos=fila[1] - ahora)
+        self.aciertos += 1
+        return fila[0]
+
+    def put(self, clave: str, respuesta: str):
+        ahora = time.time()
+        self.memoria.put(clave, respuesta)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO respuestas (clave, respuesta, vence, usado) VALUES (?, ?, ?, ?)",
+                               (clave, respuesta, ahora + self.ttl_segundos, ahora))
+            # LRU en disco: se descartan las menos usadas por encima del máximo
+            self._conn.execute("""
+                DELETE FROM respuestas WHERE clave IN (
+                    SELECT clave FROM respuestas ORDER BY usado DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_items,))
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        with self._lock:
+            en_disco = self._conn.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_acierto": self.aciertos / consultas if consultas else 0.0,
+            "en_memoria": len(self.memoria),
+            "en_disco": en_disco
+        }
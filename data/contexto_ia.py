@@ -0,0 +1,112 @@
+# data/contexto_ia.py
+from datetime import date
+from typing import List, Optional
+import numpy as np
+from domain.resumen_diario import clave_dia
+from domain.periodos import rango_periodo
+from domain.canasta import CanastaPlatos
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación local (~4 caracteres por token): no cuesta una llamada a la API."""
+    return len(texto) // 4 + 1
+
+class ContextoIA:
+    """
+    Contexto financiero compacto para los prompts, con presupuesto de tokens.
+    Se arma por niveles desde los agregados en memoria (KPIs, columnas de ventas, canasta):
+    1. totales del periodo, 2. platos más vendidos, 3. días atípicos, 4. combos,
+    5. los últimos pedidos del periodo tal cual. Lo que no entra en el presupuesto se corta desde el final.
+    """
+
+    def __init__(self, firestore_service):
+        self.fs = firestore_service
+
+    def construir(self, presupuesto_tokens: int = 1200, desde: Optional[date] = None, hasta: Optional[date] = None,
+                  top_n: int = 5, recientes: int = 10) -> str:
+        if desde is None or hasta is None:
+            desde, hasta = rango_periodo("Mes Actual")
+        self.fs.pedidos_cache.actualizar(desde)
+
+        niveles = [
+            self._nivel_totales(desde, hasta),
+            self._nivel_platos(desde, hasta, top_n),
+            self._nivel_anomalias(desde, hasta),
+            self._nivel_combos(desde, hasta),
+            self._nivel_recientes(desde, hasta, recientes)
+        ]
+
+        lineas: List[str] = []
+        usados = 0
+        for nivel in niveles:
+            for linea in nivel:
+                costo = estimar_tokens(linea + "\n")
+                if usados + costo > presupuesto_tokens:
+                    return "\n".join(lineas)
+                lineas.append(linea)
+                usados += costo
+        return "\n".join(lineas)
+
+    # --- NIVELES ---
+    def _nivel_totales(self, desde: date, hasta: date) -> List[str]:
+        r = self.fs.kpis.reporte(clave_dia(desde), clave_dia(hasta))
+        n = r["num_pedidos"]
+        costos = self.fs.actualizar_costos()
+        p50, p90 = self.fs.ventas.percentiles_ticket((50, 90), desde, hasta)
+        if costos.hay_costos:
+            costo = costos.costo_total(self.fs.ventas, desde, hasta)
+            rentabilidad = f"Costo insumos: ${costo:,.0f} | Ganancia: ${r['ingreso_bruto'] - costo:,.0f}"
+        else:
+            rentabilidad = "Costo insumos: sin datos (no hay costos cargados)"
+        return [
+            f"--- PERIODO {clave_dia(desde)} a {clave_dia(hasta)} ---",
+            f"Pedidos: {n} | Ingreso: ${r['ingreso_bruto']:,.0f} | {rentabilidad}",
+            f"Ticket promedio: ${r['ingreso_bruto'] / n if n else 0:,.0f} | mediana ${p50:,.0f} | p90 ${p90:,.0f} | "
+            f"min ${r['ticket_min']:,.0f} | max ${r['ticket_max']:,.0f} | Clientes únicos: {r['clientes_unicos']}"
+        ]
+
+    def _nivel_platos(self, desde: date, hasta: date, top_n: int) -> List[str]:
+        margenes = {m["plato"]: m for m in self.fs.costos.margen_por_plato(self.fs.ventas, desde, hasta)} \
+            if self.fs.costos.hay_costos else {}
+        lineas = [f"--- TOP {top_n} PLATOS ---"]
+        for nombre, unidades in self.fs.ventas.top_platos(top_n, desde, hasta):
+            m = margenes.get(nombre)
+            margen = f", margen {m['margen_pct']:.0f}%" if m else ""
+            lineas.append(f"- {nombre}: {unidades:,.0f} unid.{margen}")
+        return lineas if len(lineas) > 1 else []
+
+    def _nivel_anomalias(self, desde: date, hasta: date, umbral: float = 2.0) -> List[str]:
+        fechas, ventas = self.fs.ventas.ventas_por_dia(desde, hasta)
+        if fechas and fechas[-1] >= date.today():
+            fechas, ventas = fechas[:-1], ventas[:-1]  # El día en curso todavía no cierra
+        if len(ventas) < 7 or ventas.std() == 0:
+            return []
+        z = (ventas - ventas.mean()) / ventas.std()
+        atipicos = np.flatnonzero(np.abs(z) >= umbral)
+        if atipicos.size == 0:
+            return []
+        lineas = [f"--- DÍAS ATÍPICOS (promedio diario ${ventas.mean():,.0f}) ---"]
+        for i in atipicos[np.argsort(-np.abs(z[atipicos]))]:
+            lineas.append(f"- {clave_dia(fechas[i])}: ${ventas[i]:,.0f} ({z[i]:+.1f} desv.)")
+        return lineas
+
+    def _nivel_combos(self, desde: date, hasta: date) -> List[str]:
+        reglas = CanastaPlatos.del_periodo(self.fs.ventas, desde, hasta).reglas(3)
+        if not reglas:
+            return []
+        return ["--- SE PIDEN JUNTOS EN EL PERIODO ---"] + [
+            f"- {r['antecedente']} + {r['consecuente']}: confianza {r['confianza']:.0%}, lift {r['lift']:.1f}" for r in reglas
+        ]
+
+    def _nivel_recientes(self, desde: date, hasta: date, k: int) -> List[str]:
+        # Los últimos del periodo: en un mes pasado, los pedidos de hoy no dicen nada
+        ids = self.fs.ventas.recientes(k, desde, hasta)
+        if not ids:
+            return []
+        lineas = ["--- ÚLTIMOS PEDIDOS DEL PERIODO (FECHA | ID | TOTAL | ITEMS) ---"]
+        for pedido_id in ids:
+            p = self.fs.pedidos_cache.get_pedido(pedido_id)
+            if not p:
+                continue
+            items = ", ".join(f"{i.get('nombre')}({i.get('cantidad')})" for i in p.get("items", []))
+            lineas.append(f"{clave_dia(p.get('creado_en'))} | {str(pedido_id)[-4:]} | ${p.get('total', 0):,.0f} | {items}")
+        return lineas
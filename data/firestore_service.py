@@ -1,12 +1,27 @@
 # data/firestore_service.py
 from domain.models import Plato, Cliente, InventarioItem
 from domain.restaurante import Pedido
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from google.cloud import firestore 
 from google.cloud.firestore_v1.base_query import FieldFilter
+from google.api_core.exceptions import AlreadyExists, NotFound
+from domain.resumen_diario import clave_dia, hora_del_dia, acumular_resumenes
+from domain.periodos import limites_datetime
+from data.pedidos_cache import PedidosCache
+from domain.kpis import KpiAggregator
+from domain.ventas_columnar import VentasColumnar
+from domain.canasta import CanastaPlatos
+from domain.costos import MotorCostos
+from domain.pronostico import PronosticoDemanda
+from domain.recetas import MatrizRecetas
+from domain.proyeccion_insumos import proyectar_insumos
+from data.cache_lru import CacheLRU
+from datetime import date, timedelta
 
 class FirestoreService:
-    
+    # Días de ventas que se bajan para el pronóstico y la proyección de insumos
+    DIAS_HISTORIA = 90
+
     def __init__(self, firestore_client, auth_client):
         self.db = firestore_client 
         self.auth = auth_client
@@ -16,6 +31,31 @@ class FirestoreService:
         self.pedidos_col = self.db.collection("pedidos")
         self.clientes_col = self.db.collection("clientes")
         self.inventario_col = self.db.collection("inventario")
+        self.resumen_col = self.db.collection("resumen_diario")
+        # Lápidas de pedidos borrados (ID = pedido_id): así las otras terminales se enteran sin recargar todo
+        self.borrados_col = self.db.collection("pedidos_borrados")
+
+        # Copia local de pedidos: se descarga una vez y luego solo lo nuevo
+        self.pedidos_cache = PedidosCache(self.pedidos_col, self.borrados_col)
+        # KPIs incrementales alimentados por la copia local
+        self.kpis = KpiAggregator()
+        self.pedidos_cache.suscribir(self.kpis)
+        # Columnas NumPy de pedidos y líneas para análisis vectorizado
+        self.ventas = VentasColumnar()
+        self.pedidos_cache.suscribir(self.ventas)
+        # Platos que se piden juntos (combos)
+        self.canasta = CanastaPlatos()
+        self.pedidos_cache.suscribir(self.canasta)
+        # Costo por receta (se recalcula solo si cambian recetas o precios)
+        self.costos = MotorCostos()
+        # Demanda por plato (se reajusta solo con los días que se van cerrando)
+        self.pronostico = PronosticoDemanda()
+        # Recetas como matriz plato x insumo (se reconstruye solo si cambia el menú)
+        self.matriz_recetas = MatrizRecetas()
+        # Clientes frecuentes: email normalizado -> Cliente
+        self.clientes_cache = CacheLRU(max_items=500, ttl_segundos=30 * 60)
+        # Última lectura de menú e inventario ("platos" / "inventario"): entrada del motor de costos
+        self.catalogo_cache = CacheLRU(max_items=2, ttl_segundos=5 * 60)
 
     # --- 1. PLATOS ---
     def get_platos(self) -> List[Plato]:
@@ -25,6 +65,7 @@ class FirestoreService:
                 platos.append(Plato.from_dict(doc.to_dict(), doc.id))
             except Exception:
                 pass
+        self.catalogo_cache.put("platos", platos)
         return platos
 
     # --- 2. INVENTARIO ---
@@ -32,51 +73,260 @@ class FirestoreService:
         items = []
         for doc in self.inventario_col.stream():
             items.append(InventarioItem.from_dict(doc.to_dict(), doc.id))
+        self.catalogo_cache.put("inventario", items)
         return items
 
     def add_inventario_item(self, item: InventarioItem):
         self.inventario_col.add(item.to_dict())
+        self.catalogo_cache.invalidar("inventario")
+
+    def update_inventario_costo(self, item_id: str, costo_unitario: float):
+        self.inventario_col.document(item_id).update({"costo_unitario": costo_unitario})
+        self.catalogo_cache.invalidar("inventario")
+
+    def update_inventario_minimo(self, item_id: str, minimo: float):
+        self.inventario_col.document(item_id).update({"minimo": minimo})
+        self.catalogo_cache.invalidar("inventario")
+
+    def ajustar_inventario_cantidad(self, item_id: str, delta: float):
+        """Suma (o resta) stock en el servidor: no pisa cambios de otras terminales."""
+        self.inventario_col.document(item_id).update({"cantidad": firestore.Increment(delta)})
+        self.catalogo_cache.invalidar("inventario")
+
+    def actualizar_costos(self) -> MotorCostos:
+        """
+        Entrega el motor de costos al día con el menú y los precios actuales.
+        Reusa la última lectura de platos e inventario (máx. 5 min, o hasta editar el inventario).
+        """
+        platos = self.catalogo_cache.get("platos") or self.get_platos()
+        inventario = self.catalogo_cache.get("inventario") or self.get_inventario()
+        self.costos.actualizar(platos, inventario)
+        return self.costos
+
+    def inicio_historia(self) -> date:
+        return date.today() - timedelta(days=self.DIAS_HISTORIA)
 
-    def update_inventario_cantidad(self, item_id: str, nueva_cantidad: float):
-        self.inventario_col.document(item_id).update({"cantidad": nueva_cantidad})
+    def pronosticar_demanda(self, horizonte: int = 7) -> Dict[str, float]:
+        """Unidades esperadas por plato en los próximos 'horizonte' días."""
+        self.pedidos_cache.actualizar(self.inicio_historia())
+        self.pronostico.actualizar(self.ventas)
+        return self.pronostico.resumen(self.ventas, horizonte)
+
+    def proyectar_insumos(self, horizonte: int = 7, inventario: Optional[List[InventarioItem]] = None) -> List[dict]:
+        """Consumo proyectado, días de cobertura y compra sugerida por insumo (más urgente primero)."""
+        self.pedidos_cache.actualizar(self.inicio_historia())
+        self.pronostico.actualizar(self.ventas)
+        if inventario is None:
+            inventario = self.get_inventario()
+        self.matriz_recetas.actualizar(self.get_platos(), list(self.ventas.plato_ids), inventario)
+        _, demanda = self.pronostico.pronosticar(horizonte)
+        return proyectar_insumos(demanda, self.matriz_recetas.matriz, inventario)
 
     # --- 3. CLIENTES ---
     def get_or_create_cliente(self, email: str, nombre: str) -> Cliente:
-        query = self.clientes_col.where(filter=FieldFilter("email", "==", email)).limit(1).stream()
-        existing = next(query, None)
-        
-        if existing:
-            return Cliente.from_dict(existing.to_dict(), existing.id)
+        email_norm = Cliente.normalizar_email(email)
+        cliente = self.clientes_cache.get(email_norm)
+        if cliente:
+            return cliente
+
+        doc_ref = self.clientes_col.document(Cliente.id_desde_email(email_norm))
+        doc = doc_ref.get()
+        if doc.exists:
+            cliente = Cliente.from_dict(doc.to_dict(), doc.id)
         else:
-            nuevo_cliente = Cliente(id=None, nombre=nombre, email=email)
-            _, doc_ref = self.clientes_col.add(nuevo_cliente.to_dict())
-            nuevo_cliente.id = doc_ref.id
-            return nuevo_cliente
+            cliente = self._buscar_cliente_legado(email, email_norm) or self._crear_cliente(doc_ref, email_norm, nombre)
 
-    def add_pedido_to_cliente(self, cliente_id: str, pedido_id: str):
-        cliente_ref = self.clientes_col.document(cliente_id)
-        cliente_ref.update({"historial_pedidos": firestore.ArrayUnion([pedido_id])})
+        self.clientes_cache.put(email_norm, cliente)
+        return cliente
+
+    def _buscar_cliente_legado(self, email: str, email_norm: str) -> Optional[Cliente]:
+        """Clientes creados antes de los IDs por email (ID automático de Firestore)."""
+        query = self.clientes_col.where(filter=FieldFilter("email", "in", list({email, email_norm}))).limit(1).stream()
+        existing = next(query, None)
+        return Cliente.from_dict(existing.to_dict(), existing.id) if existing else None
+
+    def _crear_cliente(self, doc_ref, email_norm: str, nombre: str) -> Cliente:
+        nuevo_cliente = Cliente(id=doc_ref.id, nombre=nombre, email=email_norm)
+        try:
+            doc_ref.create(nuevo_cliente.to_dict())
+        except AlreadyExists:
+            # Otra terminal lo creó al mismo tiempo: usamos el suyo
+            doc = doc_ref.get()
+            return Cliente.from_dict(doc.to_dict(), doc.id)
+        return nuevo_cliente
+
+    def get_pedidos_cliente(self, cliente_id: str, limite: int = 20, despues_de=None):
+        """
+        Historial de un cliente, del más reciente al más antiguo, por páginas.
+        Devuelve (pedidos, cursor); el cursor se pasa como 'despues_de' para la siguiente página.
+        Requiere el índice compuesto pedidos(cliente_id ASC, creado_en DESC).
+        """
+        query = (self.pedidos_col
+                 .where(filter=FieldFilter("cliente_id", "==", cliente_id))
+                 .order_by("creado_en", direction=firestore.Query.DESCENDING)
+                 .limit(limite))
+        if despues_de is not None:
+            query = query.start_after(despues_de)
+
+        docs = list(query.stream())
+        pedidos = []
+        for doc in docs:
+            data = doc.to_dict()
+            data["id"] = doc.id
+            pedidos.append(data)
+        return pedidos, (docs[-1] if len(docs) == limite else None)
 
     # --- 4. PEDIDOS ---
-    def save_pedido(self, pedido: Pedido) -> str:
-        pedido_dict = pedido.to_dict()
-        _, doc_ref = self.pedidos_col.add(pedido_dict)
+    def finalizar_pedido_atomico(self, pedido: Pedido, consumo_insumos: Optional[Dict[str, float]] = None) -> str:
+        """
+        Cierra un pedido en un solo viaje: crea el documento, lo agrega al
+        historial del cliente, actualiza el resumen del día y descuenta los
+        insumos consumidos. O todo o nada.
+        """
+        for releer_inventario in (False, True):
+            batch = self.db.batch()
+            consumo = self._consumo_existente(consumo_insumos, releer_inventario)
+            doc_ref, pedido_dict = self._agregar_cierre_pedido(batch, pedido, consumo)
+            try:
+                batch.commit()
+                break
+            except AlreadyExists:
+                # El pedido ya se había guardado (reintento o doble envío): el batch no aplicó nada
+                return doc_ref.id
+            except NotFound:
+                # Un insumo se borró después de la última lectura del inventario:
+                # se relee y se reintenta una vez; el descuento de stock no puede perder la venta
+                if releer_inventario:
+                    raise
+
+        pedido.id = doc_ref.id
+        self.pedidos_cache.registrar(doc_ref.id, pedido_dict)
         return doc_ref.id
+
+    def finalizar_pedidos_lote(self, lote: List[Tuple[Pedido, Optional[Dict[str, float]]]]) -> List[str]:
+        """
+        Varios cierres de pedido en un solo commit (reenvío del diario local).
+        Si cualquiera falla (p. ej. AlreadyExists de un pedido ya enviado) no se aplica ninguno
+        y la excepción sube: quien llama reintenta uno por uno para aislarlo.
+        """
+        batch = self.db.batch()
+        escritos = [self._agregar_cierre_pedido(batch, pedido, self._consumo_existente(consumo)) for pedido, consumo in lote]
+        batch.commit()
+
+        for (pedido, _), (doc_ref, pedido_dict) in zip(lote, escritos):
+            pedido.id = doc_ref.id
+            self.pedidos_cache.registrar(doc_ref.id, pedido_dict)
+        return [doc_ref.id for doc_ref, _ in escritos]
+
+    def _agregar_cierre_pedido(self, batch, pedido: Pedido, consumo_insumos: Optional[Dict[str, float]] = None):
+        """Agrega al batch el pedido, su resumen diario, el contador del cliente y el descuento de stock."""
+        doc_ref, pedido_dict = self._preparar_batch_pedido(pedido, batch)
+        if pedido.cliente and pedido.cliente.id:
+            # Upsert: un cliente abierto sin conexión (ID por email) se crea con su primera venta
+            cliente_ref = self.clientes_col.document(pedido.cliente.id)
+            batch.set(cliente_ref, {
+                "nombre": pedido.cliente.nombre,
+                "email": pedido.cliente.email,
+                "num_pedidos": firestore.Increment(1),
+                "ultima_visita": pedido_dict["creado_en"]
+            }, merge=True)
+
+        # Descuento de stock en el servidor (Increment): nunca leer y reescribir desde aquí.
+        # update() y no set(merge=True): no crea insumos fantasma; el consumo ya viene filtrado
+        # contra el inventario (_consumo_existente)
+        for insumo_id, cantidad in (consumo_insumos or {}).items():
+            batch.update(self.inventario_col.document(insumo_id), {"cantidad": firestore.Increment(-cantidad)})
+        return doc_ref, pedido_dict
+
+    def _consumo_existente(self, consumo_insumos: Optional[Dict[str, float]], releer: bool = False) -> Dict[str, float]:
+        """Solo los insumos que existen en el inventario: un update() sobre uno borrado tumbaría todo el batch."""
+        if not consumo_insumos:
+            return {}
+        inventario = None if releer else self.catalogo_cache.get("inventario")
+        if inventario is None:
+            inventario = self.get_inventario()
+        ids = {i.id for i in inventario}
+        omitidos = sorted(set(consumo_insumos) - ids)
+        if omitidos:
+            print(f"Stock: insumos inexistentes en inventario, no se descuentan {omitidos}")
+        return {insumo_id: cant for insumo_id, cant in consumo_insumos.items() if insumo_id in ids}
+
+    def _preparar_batch_pedido(self, pedido: Pedido, batch):
+        """Agrega al batch el pedido (ID reservado en el cliente) y el resumen del día."""
+        pedido_dict = pedido.to_dict()
+        doc_ref = self.pedidos_col.document(pedido.id) if pedido.id else self.pedidos_col.document()
+
+        # create() y no set(): si el ID ya existe, falla todo el batch en vez de duplicar totales.
+        # 'sincronizado_en' lo pone el servidor: es la marca de la sincronización incremental
+        batch.create(doc_ref, {**pedido_dict, "sincronizado_en": firestore.SERVER_TIMESTAMP})
+        self._sumar_resumen_diario(batch, pedido_dict)
+        return doc_ref, pedido_dict
     
     def get_all_pedidos(self) -> List[dict]:
-        return [doc.to_dict() for doc in self.pedidos_col.stream()]
+        self.pedidos_cache.actualizar()
+        return self.pedidos_cache.get_pedidos()
 
     # --- 5. HISTORIAL ---
-    def get_all_pedidos_with_ids(self) -> List[dict]:
-        pedidos = []
-        for doc in self.pedidos_col.stream():
-            data = doc.to_dict()
-            data["id"] = doc.id
-            pedidos.append(data)
-        pedidos.sort(key=lambda p: str(p.get("creado_en", "")), reverse=True)
-        return pedidos
+    def iter_paginas_pedidos(self, tam_pagina: int = 50, campos: Optional[List[str]] = None,
+                             desde: Optional[date] = None, hasta: Optional[date] = None):
+        """
+        Recorre los pedidos del más reciente al más antiguo, una página por vez.
+        El orden y el corte los hace Firestore (cursor start_after): la primera
+        página cuesta lo mismo con 100 pedidos que con 100.000.
+
+        Con 'campos', Firestore solo envía esos campos (select) y cada fila es
+        una tupla liviana (id, campo1, campo2, ...) en vez de un dict completo.
+        Con 'desde'/'hasta' (días inclusive) solo recorre ese rango.
+        """
+        cursor = None
+        while True:
+            query = self._query_rango(desde, hasta).order_by("creado_en", direction=firestore.Query.DESCENDING).limit(tam_pagina)
+            if campos:
+                # 'creado_en' siempre viaja: el cursor lo necesita para continuar
+                query = query.select(list(dict.fromkeys(list(campos) + ["creado_en"])))
+            if cursor is not None:
+                query = query.start_after(cursor)
+
+            docs = list(query.stream())
+            if not docs:
+                return
+
+            if campos:
+                pagina = [self._fila_pedido(doc, campos) for doc in docs]
+            else:
+                pagina = []
+                for doc in docs:
+                    data = doc.to_dict()
+                    data["id"] = doc.id
+                    pagina.append(data)
+            yield pagina
+
+            if len(docs) < tam_pagina:
+                return
+            cursor = docs[-1]
+
+    def list_pedidos(self, campos: List[str], limite: int = 50,
+                     desde: Optional[date] = None, hasta: Optional[date] = None) -> List[tuple]:
+        """Los 'limite' pedidos más recientes (del rango, si se indica) como tuplas (id, *campos)."""
+        return next(self.iter_paginas_pedidos(limite, campos=campos, desde=desde, hasta=hasta), [])
+
+    def _query_rango(self, desde: Optional[date], hasta: Optional[date]):
+        query = self.pedidos_col
+        if desde:
+            query = query.where(filter=FieldFilter("creado_en", ">=", limites_datetime(desde, desde)[0]))
+        if hasta:
+            query = query.where(filter=FieldFilter("creado_en", "<", limites_datetime(hasta, hasta)[1]))
+        return query
+
+    @staticmethod
+    def _fila_pedido(doc, campos: List[str]) -> tuple:
+        data = doc.to_dict()
+        return (doc.id, *(data.get(c) for c in campos))
 
     def get_pedido_by_id(self, pedido_id: str) -> Optional[dict]:
+        en_cache = self.pedidos_cache.get_pedido(pedido_id)
+        if en_cache:
+            return en_cache
         try:
             doc_ref = self.pedidos_col.document(pedido_id)
             doc = doc_ref.get()
@@ -91,4 +341,96 @@ class FirestoreService:
             return None
 
     def delete_pedido(self, pedido_id: str) -> None:
-        self.pedidos_col.document(pedido_id).delete()
+        pedido = self.get_pedido_by_id(pedido_id)
+
+        batch = self.db.batch()
+        batch.delete(self.pedidos_col.document(pedido_id))
+        # La lápida viaja en la sincronización incremental de las demás terminales
+        batch.set(self.borrados_col.document(pedido_id), {"sincronizado_en": firestore.SERVER_TIMESTAMP})
+        if pedido:
+            # Revertir el resumen del día (min/max no se pueden restar: se recalculan)
+            tickets = self._recalcular_tickets_dia(pedido, excluir_id=pedido_id)
+            self._sumar_resumen_diario(batch, pedido, signo=-1, extras=tickets)
+            if pedido.get("cliente_id"):
+                # La venta crea el cliente (upsert); al borrar solo se descuenta si existe y ya
+                # tiene contador: set(merge=True) dejaría un cliente fantasma, y un cliente sin
+                # migrar (solo 'historial_pedidos') quedaría en -1
+                cliente_ref = self.clientes_col.document(pedido["cliente_id"])
+                cliente = cliente_ref.get()
+                if cliente.exists and (cliente.to_dict() or {}).get("num_pedidos"):
+                    batch.update(cliente_ref, {"num_pedidos": firestore.Increment(-1)})
+        batch.commit()
+
+        self.pedidos_cache.invalidar(pedido_id)
+
+    # --- 6. RESUMEN DIARIO (ROLLUPS) ---
+    def _sumar_resumen_diario(self, batch, pedido_dict: dict, signo: int = 1, extras: Optional[dict] = None):
+        """Agrega al batch el incremento (o reverso) del resumen del día del pedido."""
+        dia = clave_dia(pedido_dict.get("creado_en"))
+        hora = hora_del_dia(pedido_dict.get("creado_en"))
+        total = float(pedido_dict.get("total", 0.0))
+
+        unidades = {}
+        for item in pedido_dict.get("items", []):
+            nombre = item.get("nombre", "Item")
+            unidades[nombre] = unidades.get(nombre, 0) + item.get("cantidad", 0)
+
+        cambios = {
+            "fecha": dia,
+            "num_pedidos": firestore.Increment(signo),
+            "ingreso_bruto": firestore.Increment(signo * total),
+            "unidades": {nombre: firestore.Increment(signo * cant) for nombre, cant in unidades.items()},
+            # Buckets por hora: el día de la semana sale de la fecha del documento
+            "horas_pedidos": {hora: firestore.Increment(signo)},
+            "horas_ingreso": {hora: firestore.Increment(signo * total)}
+        }
+        if signo > 0:
+            cambios["ticket_min"] = firestore.Minimum(total)
+            cambios["ticket_max"] = firestore.Maximum(total)
+        if extras:
+            cambios.update(extras)
+
+        batch.set(self.resumen_col.document(dia), cambios, merge=True)
+
+    def _recalcular_tickets_dia(self, pedido_dict: dict, excluir_id: str) -> dict:
+        """Min/max de ticket del día sin el pedido indicado (consulta solo ese día)."""
+        creado_en = pedido_dict.get("creado_en")
+        if not creado_en or not hasattr(creado_en, "year"):
+            return {}
+
+        inicio = creado_en.replace(hour=0, minute=0, second=0, microsecond=0)
+        fin = inicio + timedelta(days=1)
+        query = (self.pedidos_col
+                 .where(filter=FieldFilter("creado_en", ">=", inicio))
+                 .where(filter=FieldFilter("creado_en", "<", fin))
+                 .select(["total"]))
+
+        totales = [doc.to_dict().get("total", 0.0) for doc in query.stream() if doc.id != excluir_id]
+        return {
+            "ticket_min": min(totales) if totales else None,
+            "ticket_max": max(totales) if totales else None
+        }
+
+    def get_resumenes_diarios(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> List[dict]:
+        """Resúmenes entre dos fechas 'YYYY-MM-DD' (inclusive), ordenados por día."""
+        query = self.resumen_col
+        if desde:
+            query = query.where(filter=FieldFilter("fecha", ">=", desde))
+        if hasta:
+            query = query.where(filter=FieldFilter("fecha", "<=", hasta))
+        resumenes = [doc.to_dict() for doc in query.stream()]
+        resumenes.sort(key=lambda r: r.get("fecha", ""))
+        return resumenes
+
+    def reconstruir_resumenes_diarios(self) -> int:
+        """Regenera 'resumen_diario' desde todos los pedidos (pedidos anteriores a los rollups)."""
+        resumenes = acumular_resumenes(self.get_all_pedidos())
+        dias = list(resumenes.items())
+
+        # Firestore admite hasta 500 escrituras por batch
+        for i in range(0, len(dias), 400):
+            batch = self.db.batch()
+            for dia, resumen in dias[i:i + 400]:
+                batch.set(self.resumen_col.document(dia), resumen)
+            batch.commit()
+        return len(dias)
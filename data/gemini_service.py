@@ -1,5 +1,9 @@
 import os
 import sys
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Dict, Optional
 
 
 try:
@@ -12,14 +16,32 @@ except ImportError:
 
 
 from data.firestore_service import FirestoreService
+from data.cache_respuestas_ia import CacheRespuestasIA
+from data.contexto_ia import ContextoIA
+from data.herramientas_ia import HerramientasIA
+from data.planificador_ia import CubetaTokens
 
 class GeminiService:
     # Modelo recomendado por velocidad y costo
     DEFAULT_MODEL = "gemini-2.0-flash" 
+    CONFIG_GENERACION = {"temperature": 0.7}
 
-    def __init__(self, firestore_service: FirestoreService):
+    def __init__(self, firestore_service: FirestoreService, cache: Optional[CacheRespuestasIA] = None,
+                 tasa_por_minuto: float = 15, rafaga: int = 5):
         self.fs = firestore_service
         self.model = None
+        # Prompts repetidos (consejo del día, insights con los mismos datos) no vuelven a la API
+        self.cache = cache
+        # Cuota de la API: se cobra por llamada real al modelo, no por trabajo en cola
+        self.limitador = CubetaTokens(tasa_por_minuto, rafaga)
+        # Prompts idénticos en curso (clave de caché -> aviso de fin): el segundo espera al primero
+        self._en_vuelo: Dict[str, threading.Event] = {}
+        self._lock_vuelo = threading.Lock()
+        # Contexto financiero compacto: el prompt no crece con el historial
+        self.contexto = ContextoIA(firestore_service)
+        # Funciones de análisis que el chat puede pedir en lugar de recibir los datos pegados
+        self.herramientas = HerramientasIA(firestore_service)
+        self.modelo_herramientas = None
 
         # 1. Obtener API Key de las variables de entorno
         api_key = os.environ.get("GEMINI_API_KEY")
@@ -36,97 +58,223 @@ class GeminiService:
                 print(f" Error al conectar con Gemini: {e}")
                 self.model = None
 
+        if self.model:
+            # Aparte del modelo base: si las herramientas fallan, el chat sigue con el contexto por niveles
+            try:
+                self.modelo_herramientas = genai.GenerativeModel(
+                    self.DEFAULT_MODEL,
+                    tools=self.herramientas.funciones(),
+                    system_instruction=(
+                        "Eres analista de negocios de un restaurante. Para cualquier cifra (ventas, platos, "
+                        "stock, márgenes) llama a las funciones disponibles; no inventes números."
+                    )
+                )
+            except Exception as e:
+                print(f" Function calling no disponible, se usa el contexto resumido: {e}")
+                self.modelo_herramientas = None
+
     # ------------------------------------------
     # UTILIDAD INTERNA
     # ------------------------------------------
+    @contextmanager
+    def _llamada_api(self, clave: Optional[str]):
+        """
+        Envuelve cada llamada real a Gemini (después de mirar la caché).
+        Si el mismo prompt ya está en curso, espera a que termine y entrega su respuesta
+        desde la caché; si no, toma un token de la cuota y entrega None (el llamador llama a la API).
+        """
+        if clave is None:
+            self.limitador.tomar()
+            yield None
+            return
+
+        while True:
+            with self._lock_vuelo:
+                en_curso = self._en_vuelo.get(clave)
+                if en_curso is None:
+                    propio = self._en_vuelo[clave] = threading.Event()
+                    break
+            en_curso.wait()
+            guardada = self.cache.get(clave)
+            if guardada is not None:
+                yield guardada
+                return
+            # La otra consulta falló o se canceló: esta la intenta por su cuenta
+
+        try:
+            self.limitador.tomar()
+            yield None
+        finally:
+            with self._lock_vuelo:
+                del self._en_vuelo[clave]
+            propio.set()
+
     def _generar_respuesta(self, prompt: str) -> str:
         if not self.model:
             return "Servicio de IA no disponible (Verifica tu API KEY)."
 
-        try:
-            # Llamada a la API 
-            config = GenerationConfig(temperature=0.7)
-            response = self.model.generate_content(prompt, generation_config=config)
-            
-            # Mejor manejo de posibles respuestas vacías o con seguridad bloqueada
-            if response and response.text:
-                return response.text.strip()
-            
-            # Manejo de casos 
-            if response and response.prompt_feedback and response.prompt_feedback.block_reason:
-                return f"La respuesta fue bloqueada por seguridad: {response.prompt_feedback.block_reason.name}"
+        clave = None
+        if self.cache:
+            clave = self.cache.clave(prompt, self.DEFAULT_MODEL, self.CONFIG_GENERACION)
+            guardada = self.cache.get(clave)
+            if guardada is not None:
+                return guardada
+
+        with self._llamada_api(clave) as guardada:
+            if guardada is not None:
+                return guardada
+            try:
+                # Llamada a la API 
+                config = GenerationConfig(**self.CONFIG_GENERACION)
+                response = self.model.generate_content(prompt, generation_config=config)
+                
+                # Mejor manejo de posibles respuestas vacías o con seguridad bloqueada
+                if response and response.text:
+                    texto = response.text.strip()
+                    if clave:
+                        self.cache.put(clave, texto)  # Solo se guardan respuestas válidas, no errores
+                    return texto
                 
-            return "La IA no generó una respuesta de texto."
+                # Manejo de casos 
+                if response and response.prompt_feedback and response.prompt_feedback.block_reason:
+                    return f"La respuesta fue bloqueada por seguridad: {response.prompt_feedback.block_reason.name}"
+                    
+                return "La IA no generó una respuesta de texto."
+            except Exception as e:
+                # Se imprime el error completo
+                print(f" Error en generación: {e}")
+                return "Ocurrió un error al consultar a la IA."
+
+
+    def generar_respuesta_stream(self, prompt: str, al_fragmento: Callable[[str], None],
+                                 cancelar: Optional[threading.Event] = None) -> str:
+        """
+        Igual que _generar_respuesta pero entrega el texto a medida que llega (stream=True).
+        Si 'cancelar' se activa se deja de leer; una respuesta cortada no se guarda en caché.
+        """
+        if not self.model:
+            mensaje = "Servicio de IA no disponible (Verifica tu API KEY)."
+            al_fragmento(mensaje)
+            return mensaje
+
+        clave = None
+        if self.cache:
+            clave = self.cache.clave(prompt, self.DEFAULT_MODEL, self.CONFIG_GENERACION)
+            guardada = self.cache.get(clave)
+            if guardada is not None:
+                al_fragmento(guardada)
+                return guardada
+
+        with self._llamada_api(clave) as guardada:
+            if guardada is not None:
+                al_fragmento(guardada)
+                return guardada
+
+            partes = []
+            try:
+                config = GenerationConfig(**self.CONFIG_GENERACION)
+                response = self.model.generate_content(prompt, generation_config=config, stream=True)
+                for chunk in response:
+                    if cancelar is not None and cancelar.is_set():
+                        return "".join(partes)
+                    try:
+                        texto = chunk.text
+                    except ValueError:
+                        continue  # Fragmento sin texto (ej. solo metadatos de seguridad)
+                    if texto:
+                        partes.append(texto)
+                        al_fragmento(texto)
+            except Exception as e:
+                print(f" Error en generación: {e}")
+                mensaje = "Ocurrió un error al consultar a la IA."
+                al_fragmento(("\n" if partes else "") + mensaje)
+                return "".join(partes) + mensaje
+
+            completa = "".join(partes).strip()
+            if not completa:
+                mensaje = "La IA no generó una respuesta de texto."
+                al_fragmento(mensaje)
+                return mensaje
+            if clave and not (cancelar is not None and cancelar.is_set()):
+                self.cache.put(clave, completa)
+            return completa
+
+    def responder_con_herramientas(self, pregunta: str, al_fragmento: Callable[[str], None],
+                                   cancelar: Optional[threading.Event] = None, max_rondas: int = 4) -> str:
+        """
+        Chat con function calling: el modelo pide las cifras que necesita (HerramientasIA),
+        se ejecutan en local y se le devuelven. El texto final se entrega en streaming.
+        """
+        if not self.modelo_herramientas:
+            # Sin function calling: las cifras van pegadas en el prompt (contexto por niveles)
+            contexto = self.obtener_contexto_financiero_completo()
+            prompt = f"{contexto}\n\nUsuario: {pregunta}\nResponde como analista de negocios."
+            return self.generar_respuesta_stream(prompt, al_fragmento, cancelar)
+
+        config = GenerationConfig(**self.CONFIG_GENERACION)
+        chat = self.modelo_herramientas.start_chat()
+        mensaje = f"Hoy es {date.today().isoformat()}.\n{pregunta}"
+        partes = []
+        try:
+            for _ in range(max_rondas):
+                self.limitador.tomar()  # Cada ronda es una llamada aparte a la API
+                response = chat.send_message(mensaje, generation_config=config, stream=True)
+                llamadas = []
+                for chunk in response:
+                    if cancelar is not None and cancelar.is_set():
+                        return "".join(partes)
+                    for parte in chunk.parts:
+                        if getattr(parte.function_call, "name", ""):
+                            llamadas.append(parte.function_call)
+                        elif parte.text:
+                            partes.append(parte.text)
+                            al_fragmento(parte.text)
+
+                if not llamadas:
+                    break
+                # Cada función corre sobre los agregados locales; solo su resultado vuelve al modelo
+                mensaje = [
+                    genai.protos.Part(function_response=genai.protos.FunctionResponse(
+                        name=llamada.name, response=self.herramientas.ejecutar(llamada.name, dict(llamada.args))))
+                    for llamada in llamadas
+                ]
         except Exception as e:
-            # Se imprime el error completo
             print(f" Error en generación: {e}")
-            return "Ocurrió un error al consultar a la IA."
+            mensaje_error = "Ocurrió un error al consultar a la IA."
+            al_fragmento(("\n" if partes else "") + mensaje_error)
+            return "".join(partes) + mensaje_error
 
+        if not partes:
+            mensaje_vacio = "La IA no generó una respuesta de texto."
+            al_fragmento(mensaje_vacio)
+            return mensaje_vacio
+        return "".join(partes)
 
     def _obtener_datos_conteo_platos(self):
         """Procesa pedidos para obtener estadísticas simples."""
         try:
-            pedidos = self.fs.get_all_pedidos()
-            if not pedidos: return {}, "No hay pedidos registrados."
-
-            conteo = {}
-            total_dinero = 0
+            # Columnas de ventas en memoria: solo se bajan los pedidos que faltan
+            desde = self.fs.inicio_historia()
+            self.fs.pedidos_cache.actualizar(desde)
+            ventas = self.fs.ventas
+            unidades = ventas.unidades_por_plato(desde)
 
-            for pedido in pedidos:
-                # Se mantiene la lógica de extracción segura
-                total = pedido.get("total", 0) if isinstance(pedido, dict) else getattr(pedido, "total", 0)
-                total_dinero += total
-                
-                items = pedido.get("items", []) if isinstance(pedido, dict) else getattr(pedido, "items", [])
-                for item in items:
-                    nombre = item.get("nombre", "Desconocido") if isinstance(item, dict) else getattr(item, "nombre", "Desconocido")
-                    cantidad = item.get("cantidad", 0) if isinstance(item, dict) else getattr(item, "cantidad", 0)
-                    conteo[nombre] = conteo.get(nombre, 0) + cantidad
+            conteo = {ventas.plato_nombres[i]: int(u) for i, u in enumerate(unidades) if u > 0}
+            if not conteo: return {}, "No hay pedidos registrados."
+            total_dinero = ventas.ingreso_total(desde)
 
             detalles = "\n".join([f"- {n}: {c} unid." for n, c in conteo.items()])
-            resumen = f"Ventas Totales: ${total_dinero:,.0f}\nDesglose:\n{detalles}"
+            combos = self.fs.canasta.resumen_texto(3)
+            resumen = f"Ventas últimos {self.fs.DIAS_HISTORIA} días: ${total_dinero:,.0f}\nDesglose:\n{detalles}\nSe piden juntos:\n{combos}"
             return conteo, resumen
         except Exception as e:
             print(f" Error procesando pedidos: {e}")
             return {}, "Error al procesar datos."
 
-    def obtener_contexto_financiero_completo(self):
-        """Prepara un resumen detallado con FECHAS y ITEMS individuales para el análisis de la IA."""
+    def obtener_contexto_financiero_completo(self, presupuesto_tokens: int = 1200, desde=None, hasta=None):
+        """Resumen por niveles (totales, top platos, anomalías, combos, últimos pedidos) acotado en tokens."""
         try:
-            pedidos = self.fs.get_all_pedidos()
-            if not pedidos: return "No hay historial de ventas disponible."
-
-            lineas = ["--- HISTORIAL DE TRANSACCIONES DETALLADO ---"]
-            lineas.append("FORMATO: FECHA | ID | TOTAL | ITEMS")
-            
-            total_global = 0
-            
-            for p in pedidos:
-                # Extracción segura (dict o objeto)
-                if isinstance(p, dict):
-                    fecha = p.get("fecha", "N/A")
-                    pid = str(p.get("id", "??"))[-4:]
-                    total = p.get("total", 0)
-                    items_list = p.get("items", [])
-                else:
-                    fecha = getattr(p, "fecha", "N/A")
-                    pid = str(getattr(p, "id", "??"))[-4:]
-                    total = getattr(p, "total", 0)
-                    items_list = getattr(p, "items", [])
-                
-                total_global += total
-                
-                items_str = ", ".join([
-                    f"{i.get('nombre')}({i.get('cantidad')})" 
-                    if isinstance(i, dict) else f"{getattr(i, 'nombre')}({getattr(i, 'cantidad')})"
-                    for i in items_list
-                ])
-                
-                lineas.append(f"{fecha} | {pid} | ${total} | {items_str}")
-
-            lineas.append(f"RESUMEN FINAL: Ventas Totales acumuladas: ${total_global}")
-            return "\n".join(lineas)
-
+            return self.contexto.construir(presupuesto_tokens, desde, hasta)
         except Exception as e:
             print(f"Error generando contexto: {e}")
             return f"Error leyendo datos: {e}"
@@ -183,40 +331,34 @@ class GeminiService:
     # ---------------------------------------------------------
     # 4. STOCK CRÍTICO (MODIFICADO CON BENCHMARKS Y COMPARACIÓN)
     # ---------------------------------------------------------
-    def obtener_recomendacion_inventario(self, lista_items):
-        if not lista_items: return None, "Inventario vacío."
+    def obtener_recomendacion_inventario(self, alertas):
+        """Redacta la alerta de stock ya calculada por las reglas locales (la IA no decide qué es crítico)."""
+        if not alertas: return None
 
-        items_str = ", ".join(f"{i.nombre} ({i.cantidad} {i.unidad})" for i in lista_items)
+        detalle = "\n".join(
+            f"- {a['nivel']}: {a['nombre']} = {a['cantidad']:g} {a['unidad']} (mínimo {a['minimo']:g}, pedir {a['faltante']:g})"
+            for a in alertas[:5]
+        )
 
         prompt = f"""
-        Eres Jefe de Logística. Insumos actuales: [{items_str}].
-        
-        USA ESTA TABLA DE REFERENCIA DE STOCK IDEAL (MÍNIMO SEGURO):
-        - Carne/Hamburguesa/Proteínas: 100 unidades (o 15 kg)
-        - Panes: 100 unidades
-        - Quesos/Lácteos: 5 kg (o 20 unidades si es por loncha)
-        - Verduras (Tomate, Lechuga, Cebolla): 10 kg o 15 unidades (mazos/cabezas)
-        - Salsas/Líquidos: 5 Litros
-        - Insumos secos/Especias: 1 kg
-        
-        INSTRUCCIONES DE ANÁLISIS:
-        1. Si un producto NO está explícitamente en la lista de referencia, COMPÁRALO con el producto más similar (ej: si ves 'Hamburguesa Vegana', usa el estándar de 'Carne/Hamburguesa').
-        2. Ten mucho cuidado con las UNIDADES: no confundas Kg con Unidades (100 gramos es crítico, 100 kg es mucho).
-        3. Identifica el insumo MÁS crítico basándote en la distancia negativa respecto a su ideal.
-        4. Escribe una alerta de pánico corta (max 15 palabras).
-        5. FORMATO OBLIGATORIO: NOMBRE_INSUMO|ALERTA
-        """
-
-        res = self._generar_respuesta(prompt)
+        Eres Jefe de Logística. Estas alertas de stock ya están calculadas y ordenadas por urgencia:
+        {detalle}
 
-        if "|" in res:
-            try:
-                n, f = res.split("|", 1)
-                return n.strip(), f.strip()
-            except ValueError: pass
+        Escribe UNA alerta corta (max 20 palabras) sobre la primera, mencionando cuánto pedir.
+        No cambies los números ni el orden.
+        """
+        return self._generar_respuesta(prompt)
 
-        min_item = min(lista_items, key=lambda x: x.cantidad)
-        return min_item.nombre, res
+    @staticmethod
+    def _formatear_proyeccion(proyeccion) -> str:
+        lineas = []
+        for p in proyeccion:
+            cobertura = "sin consumo previsto" if p["dias_cobertura"] == float("inf") else f"{p['dias_cobertura']:.1f} días"
+            lineas.append(
+                f"- {p['nombre']}: stock {p['stock']:g} {p['unidad']}, consumo 7 días {p['consumo_proyectado']:.1f} {p['unidad']}, "
+                f"cobertura {cobertura}, comprar {p['comprar']:.1f} {p['unidad']}"
+            )
+        return "\n".join(lineas)
 
     # ---------------------------------------------------------
     # 5. ANÁLISIS GENERAL INVENTARIO (MODIFICADO)
@@ -226,24 +368,15 @@ class GeminiService:
             inventario = self.fs.get_inventario()
             if not inventario: return "No hay datos de inventario."
 
-            items = "\n".join([f"- {i.nombre}: {i.cantidad} {i.unidad}" for i in inventario])
+            tabla = self._formatear_proyeccion(self.fs.proyectar_insumos(7, inventario))
 
             prompt = f"""
-            Actúa como Auditor de Inventarios. Analiza esta lista actual:
-            {items}
-            
-            USA ESTOS PARÁMETROS DE STOCK SALUDABLE PARA TU JUICIO:
-            - Carnes/Hamburguesas: Ideal 100 unid.
-            - Pan: Ideal 100 unid.
-            - Queso: Ideal 5 kg.
-            - Verduras (Lechuga/Tomate): Ideal 10 kg o 15 unidades.
-            - Bebidas/Otros: Ideal 50 unid.
-
-            REGLA DE ORO: 
-            Si aparece un producto nuevo o desconocido, asócialo a la categoría más cercana de la lista anterior para juzgar si su stock es bajo o alto.
-            
-            Detecta ineficiencias y riesgos de quiebre. Sé conciso (máximo 4 líneas). 
-            Presta atención estricta a las unidades (Kg vs Unid vs Litros) para no generar alertas falsas.
+            Actúa como Auditor de Inventarios. Esta es la proyección de consumo de la próxima semana
+            (pronóstico de ventas x recetas), ordenada del insumo más urgente al menos urgente:
+            {tabla}
+
+            Detecta riesgos de quiebre (cobertura menor a 7 días) y sobre-stock (insumos sin consumo previsto).
+            Usa los números tal cual, sin inventar otros. Sé conciso (máximo 4 líneas).
             """
             return self._generar_respuesta(prompt)
         except Exception as e:
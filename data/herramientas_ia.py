@@ -0,0 +1,86 @@
+# data/herramientas_ia.py
+from datetime import date
+from typing import Callable, Dict, List, Tuple
+from domain.periodos import rango_periodo, parsear_fecha
+from domain.resumen_diario import clave_dia
+from domain.alertas_stock import evaluar_stock
+
+class HerramientasIA:
+    """
+    Funciones de análisis que Gemini puede pedir (function calling).
+    Todas corren sobre los agregados en memoria: el modelo recibe solo las cifras
+    que pidió y el costo no depende del tamaño del historial.
+    Las firmas y docstrings son lo que ve el modelo: tipos simples y fechas 'YYYY-MM-DD'.
+    """
+
+    def __init__(self, firestore_service):
+        self.fs = firestore_service
+
+    def funciones(self) -> List[Callable]:
+        return [self.ventas_por_periodo, self.top_platos, self.stock_bajo_minimo, self.margen_por_plato]
+
+    def ejecutar(self, nombre: str, argumentos: dict) -> dict:
+        """Despacha una llamada del modelo; cualquier error (argumentos, Firestore, red) vuelve al modelo como texto."""
+        funciones = {f.__name__: f for f in self.funciones()}
+        funcion = funciones.get(nombre)
+        if funcion is None:
+            return {"error": f"Función desconocida: {nombre}"}
+        try:
+            return {"resultado": funcion(**argumentos)}
+        except Exception as e:
+            print(f"Error en herramienta IA '{nombre}': {e}")
+            return {"error": str(e)}
+
+    def _rango(self, desde: str, hasta: str) -> Tuple[date, date]:
+        if desde and hasta:
+            return rango_periodo("Personalizado", desde=parsear_fecha(desde), hasta=parsear_fecha(hasta))
+        return rango_periodo("Mes Actual")
+
+    # --- FUNCIONES EXPUESTAS AL MODELO ---
+    def ventas_por_periodo(self, desde: str = "", hasta: str = "") -> Dict:
+        """Totales de ventas entre dos fechas YYYY-MM-DD (inclusive); sin fechas usa el mes actual.
+        Devuelve pedidos, ingreso, costo de insumos, ganancia, ticket promedio/mediana y clientes únicos."""
+        inicio, fin = self._rango(desde, hasta)
+        self.fs.pedidos_cache.actualizar(inicio)
+        r = self.fs.kpis.reporte(clave_dia(inicio), clave_dia(fin))
+        costos = self.fs.actualizar_costos()
+        # Sin costos de insumos cargados: costo y ganancia desconocidos (None), no un margen del 100%
+        costo = costos.costo_total(self.fs.ventas, inicio, fin) if costos.hay_costos else None
+        mediana, = self.fs.ventas.percentiles_ticket((50,), inicio, fin)
+        n = r["num_pedidos"]
+        return {
+            "desde": clave_dia(inicio),
+            "hasta": clave_dia(fin),
+            "pedidos": n,
+            "ingreso": round(r["ingreso_bruto"], 2),
+            "costo_insumos": round(costo, 2) if costo is not None else None,
+            "ganancia": round(r["ingreso_bruto"] - costo, 2) if costo is not None else None,
+            "ticket_promedio": round(r["ingreso_bruto"] / n, 2) if n else 0.0,
+            "ticket_mediana": round(mediana, 2),
+            "clientes_unicos": r["clientes_unicos"]
+        }
+
+    def top_platos(self, n: int = 5, desde: str = "", hasta: str = "") -> List[Dict]:
+        """Los n platos más vendidos (en unidades) entre dos fechas YYYY-MM-DD; sin fechas usa el mes actual."""
+        inicio, fin = self._rango(desde, hasta)
+        self.fs.pedidos_cache.actualizar(inicio)
+        return [{"plato": nombre, "unidades": unidades}
+                for nombre, unidades in self.fs.ventas.top_platos(int(n), inicio, fin)]
+
+    def stock_bajo_minimo(self) -> List[Dict]:
+        """Insumos en alerta (agotados, bajo su mínimo o bajo su punto de reorden), del más urgente al menos urgente."""
+        # El catálogo en caché se invalida con cada edición de inventario: no hace falta releer Firestore
+        inventario = self.fs.catalogo_cache.get("inventario") or self.fs.get_inventario()
+        return [{"insumo": a["nombre"], "nivel": a["nivel"], "cantidad": a["cantidad"], "unidad": a["unidad"],
+                 "minimo": a["minimo"], "pedir": round(a["faltante"], 2)}
+                for a in evaluar_stock(inventario)]
+
+    def margen_por_plato(self, desde: str = "", hasta: str = "") -> List[Dict]:
+        """Unidades, ingreso, costo de receta y margen (monto y %) de cada plato entre dos fechas YYYY-MM-DD."""
+        inicio, fin = self._rango(desde, hasta)
+        self.fs.pedidos_cache.actualizar(inicio)
+        costos = self.fs.actualizar_costos()
+        if not costos.hay_costos:
+            return [{"aviso": "No hay costos de insumos cargados: el margen no se puede calcular."}]
+        return [{clave: round(valor, 2) if isinstance(valor, float) else valor for clave, valor in m.items()}
+                for m in costos.margen_por_plato(self.fs.ventas, inicio, fin)]
@@ -0,0 +1,143 @@
+# data/pedidos_cache.py
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+from domain.periodos import limites_datetime
+
+class PedidosCache:
+    """
+    Copia local de la colección 'pedidos', desde el día más antiguo que alguien pidió.
+    Solo se descarga la ventana pedida (consulta por 'creado_en'); si después se pide
+    un periodo más antiguo, se baja únicamente el tramo que falta.
+    Lo nuevo llega con los documentos cuyo 'sincronizado_en' (hora del servidor al escribir)
+    es igual o posterior a la mayor que ya se conoce. 'creado_en' no sirve de marca: lo pone
+    la terminal, con su reloj, y un pedido reenviado desde el diario local llega con una hora vieja.
+    Los borrados llegan igual: delete_pedido deja una lápida en 'pedidos_borrados'
+    con su propio 'sincronizado_en', y la misma consulta incremental la aplica.
+    """
+
+    # Marca inicial: con '>=' solo devuelve documentos que tienen el campo
+    _MARCA_INICIAL = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    # Solape de la consulta incremental: un commit en vuelo puede recibir una hora
+    # del servidor anterior a la de un documento que ya se vio
+    _MARGEN = timedelta(seconds=60)
+
+    def __init__(self, pedidos_col, borrados_col):
+        self.col = pedidos_col
+        self.borrados_col = borrados_col
+        self._pedidos: Dict[str, dict] = {}
+        self._ultima_marca = self._MARCA_INICIAL
+        self._cubierto_desde: Optional[date] = None  # Primer día en memoria (date.min = todo el historial)
+        self._cargado = False
+        self._oyentes = []  # Agregadores que se actualizan pedido a pedido
+        # _lock protege la copia en memoria y se toma por poco tiempo (la caja registra aquí);
+        # _lock_descarga hace que un solo hilo descargue a la vez (reportes, IA e historial corren en hilos)
+        self._lock = threading.RLock()
+        self._lock_descarga = threading.Lock()
+
+    # --- OYENTES ---
+    def suscribir(self, oyente):
+        """
+        'oyente' implementa agregar(pedido) y quitar(pedido_id).
+        Recibe de inmediato los pedidos que ya están en memoria.
+        """
+        with self._lock:
+            self._oyentes.append(oyente)
+            for data in self._pedidos.values():
+                oyente.agregar(data)
+
+    # --- SINCRONIZACIÓN ---
+    def actualizar(self, desde: Optional[date] = None):
+        """Trae del servidor solo lo que falta en la copia local desde el día 'desde' (None = todo el historial)."""
+        objetivo = desde or date.min
+        with self._lock_descarga:
+            with self._lock:
+                cargado = self._cargado
+                cubierto = self._cubierto_desde
+                marca = self._ultima_marca
+
+            # Las descargas van fuera de _lock: la caja puede registrar pedidos mientras tanto
+            borrados = []
+            if not cargado:
+                inicio = objetivo
+                # La marca se toma antes de bajar la ventana: lo escrito durante la descarga entra en la próxima
+                marca = max(marca, self._marca_servidor())
+                docs = self._descargar(inicio, None)
+            else:
+                inicio = min(objetivo, cubierto)
+                docs = self._descargar(objetivo, cubierto) if objetivo < cubierto else []
+                # '>=' y margen para no perder cambios con la misma marca (se deduplican por ID)
+                desde_marca = FieldFilter("sincronizado_en", ">=", marca - self._MARGEN)
+                docs += [(doc.id, doc.to_dict()) for doc in self.col.where(filter=desde_marca).stream()]
+                borrados = [(doc.id, doc.to_dict()) for doc in self.borrados_col.where(filter=desde_marca).stream()]
+
+            with self._lock:
+                for pedido_id, data in docs:
+                    self._guardar_local(pedido_id, data)
+                    self._avanzar_marca(data.get("sincronizado_en"))
+                # Lápidas: pedidos borrados en cualquier terminal desde la última sincronización
+                for pedido_id, data in borrados:
+                    self._quitar_local(pedido_id)
+                    self._avanzar_marca(data.get("sincronizado_en"))
+                self._avanzar_marca(marca)
+                self._cubierto_desde = inicio
+                self._cargado = True
+
+    def _descargar(self, desde: date, hasta: Optional[date]) -> List[tuple]:
+        """Pedidos con 'creado_en' en [desde, hasta) como (id, datos)."""
+        query = self.col
+        if desde > date.min:
+            query = query.where(filter=FieldFilter("creado_en", ">=", limites_datetime(desde, desde)[0]))
+        if hasta is not None and hasta > date.min:
+            query = query.where(filter=FieldFilter("creado_en", "<", limites_datetime(hasta, hasta)[0]))
+        return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+    def _marca_servidor(self):
+        """Mayor 'sincronizado_en' de la colección (una sola lectura)."""
+        query = self.col.order_by("sincronizado_en", direction=firestore.Query.DESCENDING).limit(1)
+        doc = next(query.stream(), None)
+        if doc is None:
+            return self._MARCA_INICIAL
+        return doc.to_dict().get("sincronizado_en") or self._MARCA_INICIAL
+
+    def _guardar_local(self, pedido_id: str, data: dict):
+        data["id"] = pedido_id
+        if self._pedidos.get(pedido_id) == data:
+            return  # Re-descargado sin cambios (solape de la consulta incremental): nada que avisar
+        self._pedidos[pedido_id] = data
+        for oyente in self._oyentes:
+            oyente.agregar(data)
+
+    def _quitar_local(self, pedido_id: str):
+        if self._pedidos.pop(pedido_id, None) is not None:
+            for oyente in self._oyentes:
+                oyente.quitar(pedido_id)
+
+    def _avanzar_marca(self, sincronizado_en):
+        # Pedidos anteriores al campo no traen marca; las del servidor siempre vienen con zona
+        if sincronizado_en is None or getattr(sincronizado_en, "tzinfo", None) is None:
+            return
+        if sincronizado_en > self._ultima_marca:
+            self._ultima_marca = sincronizado_en
+
+    # --- CAMBIOS LOCALES ---
+    def registrar(self, pedido_id: str, data: dict):
+        """Agrega un pedido recién guardado sin esperar a la próxima sincronización."""
+        with self._lock:
+            self._guardar_local(pedido_id, dict(data))
+
+    def invalidar(self, pedido_id: str):
+        """Quita un pedido borrado de la copia local."""
+        with self._lock:
+            self._quitar_local(pedido_id)
+
+    # --- LECTURA ---
+    def get_pedidos(self) -> List[dict]:
+        with self._lock:
+            return list(self._pedidos.values())
+
+    def get_pedido(self, pedido_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._pedidos.get(pedido_id)
@@ -0,0 +1,201 @@
+# data/pedidos_journal.py
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from google.api_core.exceptions import Aborted, ClientError, TooManyRequests
+from domain.models import Cliente
+from domain.restaurante import Pedido
+
+class PedidosJournal:
+    """
+    Diario local de pedidos finalizados (SQLite en modo WAL).
+    El pedido se guarda primero en disco y la caja sigue atendiendo;
+    un hilo en segundo plano lo envía a Firestore cuando hay conexión,
+    hasta 'tam_lote' pedidos por commit.
+    Un pedido que falla por sí mismo (no por la red) se reintenta con espera creciente
+    y, tras MAX_INTENTOS, pasa a 'fallido' sin frenar a los que vienen detrás.
+    """
+
+    MAX_INTENTOS = 5
+
+    def __init__(self, firestore_service, ruta: str = "pedidos_journal.db", tam_lote: int = 20, espera_max: float = 60.0):
+        self.fs = firestore_service
+        self.tam_lote = tam_lote
+        self.espera_max = espera_max
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")  # Una venta confirmada sobrevive a un corte de luz
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pendientes (
+                clave TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                ultimo_error TEXT
+            )
+        """)
+        # Diarios creados antes del reintento por pedido: se agregan las columnas que falten
+        columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(pendientes)")}
+        if "estado" not in columnas:
+            self._conn.execute("ALTER TABLE pendientes ADD COLUMN estado TEXT NOT NULL DEFAULT 'pendiente'")
+        if "proximo_intento" not in columnas:
+            self._conn.execute("ALTER TABLE pendientes ADD COLUMN proximo_intento REAL NOT NULL DEFAULT 0")
+
+        self._oyentes: List[Callable[[int, int], None]] = []
+
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # --- REGISTRO (CAMINO CRÍTICO DE LA CAJA) ---
+    def registrar(self, pedido: Pedido, consumo_insumos: Optional[Dict[str, float]] = None) -> str:
+        """Escribe el pedido en disco y devuelve su ID sin esperar a la red."""
+        if not pedido.id:
+            pedido.id = uuid.uuid4().hex  # Clave de idempotencia = ID del documento en Firestore
+
+        datos = pedido.to_dict()
+        datos["creado_en"] = pedido.creado_en.isoformat()
+        payload = {
+            "pedido": datos,
+            "cliente": {"id": pedido.cliente.id, "nombre": pedido.cliente.nombre, "email": pedido.cliente.email},
+            "consumo": consumo_insumos or {}
+        }
+
+        with self._lock:
+            # OR IGNORE: registrar dos veces el mismo pedido no lo duplica
+            self._conn.execute("INSERT OR IGNORE INTO pendientes (clave, payload) VALUES (?, ?)",
+                               (pedido.id, json.dumps(payload)))
+        self._despertar.set()
+        self._avisar()
+        return pedido.id
+
+    def cantidad_pendientes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pendientes WHERE estado = 'pendiente'").fetchone()[0]
+
+    def cantidad_fallidos(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pendientes WHERE estado = 'fallido'").fetchone()[0]
+
+    def suscribir(self, oyente: Callable[[int, int], None]):
+        """oyente(pendientes, fallidos) tras cada cambio; corre en el hilo que hizo el cambio."""
+        self._oyentes.append(oyente)
+        oyente(self.cantidad_pendientes(), self.cantidad_fallidos())
+
+    def _avisar(self):
+        if not self._oyentes:
+            return
+        pendientes, fallidos = self.cantidad_pendientes(), self.cantidad_fallidos()
+        for oyente in self._oyentes:
+            oyente(pendientes, fallidos)
+
+    # --- REENVÍO A FIRESTORE ---
+    def enviar_pendientes(self) -> int:
+        """
+        Envía un lote de pedidos en orden de llegada en un solo commit y devuelve cuántas filas procesó.
+        Si el lote falla por un error de red, la excepción sube (el ciclo espera y reintenta).
+        Si falla por otra causa, se reenvía uno por uno para aislar al pedido problemático.
+        """
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT clave, payload FROM pendientes WHERE estado = 'pendiente' AND proximo_intento <= ? "
+                "ORDER BY rowid LIMIT ?", (time.time(), self.tam_lote)
+            ).fetchall()
+        if not filas:
+            return 0
+
+        lote = []
+        for clave, payload in filas:
+            try:
+                lote.append((clave, self._reconstruir(clave, json.loads(payload))))
+            except (KeyError, ValueError, TypeError) as e:
+                self._registrar_fallo(clave, e)  # Payload dañado: ningún reintento lo arregla
+
+        try:
+            if lote:
+                # Documentos con ID fijo y create(): reenviar tras una respuesta perdida es un no-op
+                self.fs.finalizar_pedidos_lote([pedido_consumo for _, pedido_consumo in lote])
+                self._borrar([clave for clave, _ in lote])
+        except Exception as e:
+            if self._es_transitorio(e):
+                raise
+            for clave, (pedido, consumo) in lote:
+                self._enviar_uno(clave, pedido, consumo)
+
+        self._avisar()
+        return len(filas)
+
+    def _enviar_uno(self, clave: str, pedido: Pedido, consumo: Dict[str, float]):
+        try:
+            # Aquí AlreadyExists se trata como éxito: el pedido ya estaba en Firestore
+            self.fs.finalizar_pedido_atomico(pedido, consumo)
+        except Exception as e:
+            if self._es_transitorio(e):
+                raise
+            self._registrar_fallo(clave, e)
+            return
+        self._borrar([clave])
+
+    @staticmethod
+    def _es_transitorio(error: Exception) -> bool:
+        """Errores del pedido en sí (4xx, datos inválidos) no se arreglan esperando; el resto sí (red, 5xx)."""
+        if isinstance(error, (Aborted, TooManyRequests)):
+            return True
+        return not isinstance(error, (ClientError, KeyError, ValueError, TypeError))
+
+    def _registrar_fallo(self, clave: str, error: Exception):
+        print(f"Journal: pedido {clave} rechazado ({error})")
+        with self._lock:
+            intentos = self._conn.execute("SELECT intentos FROM pendientes WHERE clave = ?", (clave,)).fetchone()[0] + 1
+            estado = "fallido" if intentos >= self.MAX_INTENTOS else "pendiente"
+            # Espera propia del pedido: los que vienen detrás siguen saliendo
+            proximo = time.time() + min(30 * 2 ** intentos, 3600)
+            self._conn.execute("UPDATE pendientes SET intentos = ?, ultimo_error = ?, estado = ?, proximo_intento = ? "
+                               "WHERE clave = ?", (intentos, str(error), estado, proximo, clave))
+
+    def _borrar(self, claves: List[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pendientes WHERE clave = ?", [(clave,) for clave in claves])
+
+    def _reconstruir(self, clave: str, payload: dict):
+        datos_cliente = payload.get("cliente", {})
+        cliente = Cliente(id=datos_cliente.get("id"), nombre=datos_cliente.get("nombre", "N/A"), email=datos_cliente.get("email", "N/A"))
+
+        datos = payload["pedido"]
+        datos["creado_en"] = datetime.fromisoformat(datos["creado_en"])
+        return Pedido.from_dict(datos, clave, cliente), payload.get("consumo", {})
+
+    # --- HILO EN SEGUNDO PLANO ---
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._despertar.set()
+
+    def _ciclo(self):
+        espera = 1.0
+        while not self._detener.is_set():
+            try:
+                enviados = self.enviar_pendientes()
+                espera = 1.0
+            except Exception as e:
+                print(f"Journal: sin conexión, reintento en {espera:.0f}s ({e})")
+                # Backoff exponencial: no se martilla la red mientras está caída
+                self._detener.wait(espera)
+                espera = min(espera * 2, self.espera_max)
+                continue
+
+            if enviados < self.tam_lote:
+                # Nada más por ahora: dormir hasta un pedido nuevo (o revisar cada 30 s)
+                self._despertar.wait(30)
+                self._despertar.clear()
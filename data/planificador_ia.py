@@ -0,0 +1,112 @@
+# data/planificador_ia.py
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+class CubetaTokens:
+    """Limitador de tasa: 'capacidad' llamadas seguidas y luego 'tasa_por_minuto' sostenidas."""
+
+    def __init__(self, tasa_por_minuto: float = 15, capacidad: int = 5):
+        self.tasa = tasa_por_minuto / 60.0
+        self.capacidad = capacidad
+        self._tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self):
+        """Bloquea hasta que haya un token disponible."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.tasa
+            time.sleep(espera)
+
+class PlanificadorIA:
+    """
+    Cola común de los trabajos de IA.
+    - Pocos hilos trabajadores fijos (no un hilo nuevo por consulta).
+    - Trabajos con la misma 'clave' en cola o en curso se fusionan en uno solo.
+    - El chat (prioridad 0) pasa delante de los trabajos de fondo.
+    - Los trabajos de fondo de una vista oculta se descartan.
+    La cuota de la API (CubetaTokens) la cobra GeminiService en cada llamada real al modelo:
+    un trabajo puede hacer varias llamadas (chat con herramientas) o ninguna (respuesta en caché).
+    """
+
+    PRIORIDAD_CHAT = 0
+    PRIORIDAD_FONDO = 10
+
+    def __init__(self, max_trabajadores: int = 2):
+        # La UI indica qué vista se ve; por defecto todas cuentan como visibles
+        self.vista_visible: Callable[[str], bool] = lambda vista: True
+
+        self._cola: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._secuencia = itertools.count()  # Desempate FIFO dentro de la misma prioridad
+        self._en_vuelo: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+
+        for _ in range(max_trabajadores):
+            threading.Thread(target=self._trabajar, daemon=True).start()
+
+    def enviar(self, tarea: Callable[[], Any], prioridad: int = PRIORIDAD_FONDO, clave: Any = None,
+               vista: Optional[str] = None, al_terminar: Optional[Callable[[Any], None]] = None) -> Optional[Future]:
+        """
+        Encola 'tarea' y devuelve su Future (None si se descartó por estar la vista oculta).
+        'al_terminar(resultado)' corre en el hilo trabajador: la UI debe pasar por after().
+        """
+        if not self._debe_correr(prioridad, vista):
+            return None
+
+        with self._lock:
+            futuro = self._en_vuelo.get(clave) if clave is not None else None
+            nuevo = futuro is None
+            if nuevo:
+                futuro = Future()
+                if clave is not None:
+                    self._en_vuelo[clave] = futuro
+
+        if al_terminar:
+            futuro.add_done_callback(lambda f: self._avisar(f, al_terminar))
+        if nuevo:
+            self._cola.put((prioridad, next(self._secuencia), tarea, clave, vista, futuro))
+        return futuro
+
+    def _debe_correr(self, prioridad: int, vista: Optional[str]) -> bool:
+        return prioridad <= self.PRIORIDAD_CHAT or vista is None or self.vista_visible(vista)
+
+    @staticmethod
+    def _avisar(futuro: Future, al_terminar: Callable[[Any], None]):
+        if futuro.cancelled() or futuro.exception() is not None:
+            return
+        try:
+            al_terminar(futuro.result())
+        except Exception as e:
+            print(f"Error en respuesta IA: {e}")
+
+    def _trabajar(self):
+        while True:
+            prioridad, _, tarea, clave, vista, futuro = self._cola.get()
+            try:
+                # La vista pudo ocultarse mientras el trabajo esperaba en la cola
+                if not self._debe_correr(prioridad, vista):
+                    futuro.cancel()
+                    continue
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                try:
+                    futuro.set_result(tarea())
+                except Exception as e:
+                    print(f"Error en tarea IA: {e}")
+                    futuro.set_exception(e)
+            finally:
+                with self._lock:
+                    if clave is not None and self._en_vuelo.get(clave) is futuro:
+                        del self._en_vuelo[clave]
+                self._cola.task_done()
@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional
+from domain.models import InventarioItem
+
+# Niveles de alerta, del más grave al más leve
+AGOTADO = "AGOTADO"
+CRITICO = "CRÍTICO"
+REPONER = "REPONER"
+_GRAVEDAD = {AGOTADO: 0, CRITICO: 1, REPONER: 2}
+
+def punto_reorden(item: InventarioItem, consumo_diario: float = 0.0, dias_reposicion: float = 2.0) -> float:
+    """
+    Stock (en unidad base) en el que conviene pedir: el mínimo de seguridad
+    más lo que se consume mientras llega el proveedor.
+    """
+    return item.minimo_base + max(consumo_diario, 0.0) * dias_reposicion
+
+def evaluar_stock(items: List[InventarioItem], consumo_diario: Optional[Dict[str, float]] = None,
+                  dias_reposicion: float = 2.0) -> List[Dict]:
+    """
+    Reglas locales de stock: devuelve solo los insumos en alerta, ordenados por gravedad
+    y luego por faltante relativo (así 2 kg y 20 unidades se comparan en la misma escala).
+    'consumo_diario' (insumo_id -> unidades base por día) es opcional; sin él solo se usa 'minimo'.
+    Todo se compara en unidades base; el resultado vuelve a la unidad del insumo para mostrarlo.
+    """
+    consumo_diario = consumo_diario or {}
+    alertas = []
+    for item in items:
+        reorden = punto_reorden(item, consumo_diario.get(item.id, 0.0), dias_reposicion)
+        if reorden <= 0:
+            continue  # Sin mínimo ni consumo conocido no hay regla que aplicar
+        stock = item.cantidad_base
+        if stock <= 0:
+            nivel = AGOTADO
+        elif stock < item.minimo_base:
+            nivel = CRITICO
+        elif stock < reorden:
+            nivel = REPONER
+        else:
+            continue
+
+        faltante = max(reorden - stock, 0.0)
+        alertas.append({
+            "insumo_id": item.id,
+            "nombre": item.nombre,
+            "unidad": item.unidad,
+            "cantidad": item.cantidad,
+            "minimo": item.minimo,
+            "punto_reorden": item.desde_base(reorden),
+            "faltante": item.desde_base(faltante),
+            "nivel": nivel,
+            "_relativo": faltante / reorden
+        })
+
+    alertas.sort(key=lambda a: (_GRAVEDAD[a["nivel"]], -a["_relativo"]))
+    for a in alertas:
+        del a["_relativo"]
+    return alertas
+
+def frase_alerta(alertas: List[Dict]) -> str:
+    """Texto fijo para la alerta principal (se muestra al instante, sin IA)."""
+    if not alertas:
+        return "Stock en orden: ningún insumo bajo su punto de reorden."
+    a = alertas[0]
+    texto = f"{a['nivel']}: {a['nombre']} tiene {a['cantidad']:g} {a['unidad']} (mínimo {a['minimo']:g}). Pedir {a['faltante']:g} {a['unidad']}."
+    if len(alertas) > 1:
+        texto += f" (+{len(alertas) - 1} insumos más en alerta)"
+    return texto
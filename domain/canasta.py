@@ -0,0 +1,119 @@
+import threading
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Dict, List, Tuple
+
+class CanastaPlatos:
+    """
+    Co-ocurrencia de platos en un mismo pedido (análisis de canasta).
+    Matriz plato x plato dispersa: solo se guardan los pares que aparecieron juntos.
+    Se actualiza pedido a pedido con la misma interfaz que los oyentes de PedidosCache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._pedidos: Dict[str, Tuple[str, ...]] = {}  # id -> platos distintos (para poder restar)
+            self.nombres: Dict[str, str] = {}                # clave de plato -> nombre visible
+            self.n_pedidos = 0
+            self.por_plato = Counter()                       # pedidos que contienen el plato
+            self.pares = Counter()                           # (a, b) con a < b -> pedidos con ambos
+
+    @classmethod
+    def del_periodo(cls, ventas, desde=None, hasta=None) -> "CanastaPlatos":
+        """
+        Canasta aparte con solo los pedidos del rango, armada desde las columnas de VentasColumnar.
+        La canasta global suma todo lo que esté en memoria, sin importar el periodo elegido.
+        """
+        filas, platos, cantidades, _ = ventas.lineas(desde, hasta)
+        items = defaultdict(list)
+        for fila, codigo, cantidad in zip(filas.tolist(), platos.tolist(), cantidades.tolist()):
+            items[fila].append({"plato_id": ventas.plato_ids[codigo], "nombre": ventas.plato_nombres[codigo],
+                                "cantidad": cantidad})
+        canasta = cls()
+        for fila, lineas in items.items():
+            canasta.agregar({"id": fila, "items": lineas})
+        return canasta
+
+    # --- INGESTA ---
+    def agregar(self, pedido: dict):
+        claves = set()
+        for item in pedido.get("items", []):
+            if item.get("cantidad", 0) <= 0:
+                continue
+            clave = item.get("plato_id") or item.get("nombre", "Item")
+            claves.add(clave)
+            self.nombres.setdefault(clave, item.get("nombre", clave))
+        platos = tuple(sorted(claves))
+
+        with self._lock:
+            anterior = self._pedidos.pop(pedido.get("id"), None)
+            if anterior is not None:
+                self._aplicar(anterior, -1)  # Re-sincronizado: se reemplaza
+            self._pedidos[pedido.get("id")] = platos
+            self._aplicar(platos, 1)
+
+    def quitar(self, pedido_id: str):
+        with self._lock:
+            platos = self._pedidos.pop(pedido_id, None)
+            if platos is not None:
+                self._aplicar(platos, -1)
+
+    def _aplicar(self, platos: Tuple[str, ...], signo: int):
+        self.n_pedidos += signo
+        for p in platos:
+            self.por_plato[p] += signo
+            if self.por_plato[p] <= 0:
+                del self.por_plato[p]
+        for par in combinations(platos, 2):
+            self.pares[par] += signo
+            if self.pares[par] <= 0:
+                del self.pares[par]
+
+    # --- CONSULTA ---
+    def reglas(self, n: int = 5, min_soporte: float = 0.01, min_pedidos: int = 3, min_lift: float = 1.1) -> List[dict]:
+        """
+        Reglas "quien pide A también pide B" ordenadas por lift.
+        soporte = P(A y B), confianza = P(B | A), lift = confianza / P(B) (>1: se venden juntos más que por azar;
+        el margen de 'min_lift' descarta pares independientes con ruido).
+        """
+        with self._lock:
+            total = self.n_pedidos
+            if total <= 0:
+                return []
+            pares = [(par, c) for par, c in self.pares.items() if c >= min_pedidos and c / total >= min_soporte]
+            por_plato = dict(self.por_plato)
+
+        reglas = []
+        for (a, b), juntos in pares:
+            soporte = juntos / total
+            # Se toma la dirección más confiable (A -> B o B -> A)
+            ant, cons = (a, b) if por_plato[a] <= por_plato[b] else (b, a)
+            confianza = juntos / por_plato[ant]
+            lift = confianza / (por_plato[cons] / total)
+            if lift < min_lift:
+                continue
+            reglas.append({
+                "antecedente": self.nombres.get(ant, ant),
+                "consecuente": self.nombres.get(cons, cons),
+                "pedidos": juntos,
+                "soporte": soporte,
+                "confianza": confianza,
+                "lift": lift
+            })
+        reglas.sort(key=lambda r: (r["lift"], r["soporte"]), reverse=True)
+        return reglas[:n]
+
+    def resumen_texto(self, n: int = 5) -> str:
+        """Hechos ya calculados para el contexto de la IA (sin volcar transacciones)."""
+        reglas = self.reglas(n)
+        if not reglas:
+            return "Sin combinaciones frecuentes todavía."
+        return "\n".join(
+            f"- {r['antecedente']} + {r['consecuente']}: {r['pedidos']} pedidos "
+            f"(soporte {r['soporte']:.1%}, confianza {r['confianza']:.0%}, lift {r['lift']:.2f})"
+            for r in reglas
+        )
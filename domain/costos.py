@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+from datetime import date
+import numpy as np
+from domain.models import Plato, InventarioItem
+from domain.ventas_columnar import VentasColumnar
+from domain.recetas import receta_en_base
+
+class MotorCostos:
+    """
+    Costo real de lo vendido (COGS) a partir de las recetas (Plato.insumos)
+    y del costo unitario de cada insumo.
+    El costo por plato se calcula una vez y solo se recalcula si cambian
+    las recetas o los precios; el costo de los pedidos es una pasada vectorizada.
+    """
+
+    def __init__(self):
+        self._firma = None
+        self._costo_plato: Dict[str, float] = {}  # plato_id (y nombre) -> costo de una unidad
+        self.hay_costos = False  # False: ninguna receta tiene costo (el margen sería un 100% falso)
+
+    # --- COSTO POR RECETA (CACHEADO) ---
+    def actualizar(self, platos: List[Plato], inventario: List[InventarioItem]) -> bool:
+        """Recalcula el costo de cada receta si cambió el menú o algún precio. Devuelve True si recalculó."""
+        firma = (tuple(sorted((p.id or "", p.nombre, tuple(sorted((k, str(v)) for k, v in p.insumos.items()))) for p in platos)),
+                 tuple(sorted((i.id or "", i.costo_unitario, i.unidad, tuple(sorted(i.conversiones.items()))) for i in inventario)))
+        if firma == self._firma:
+            return False
+
+        # Recetas y precios en unidad base: "150 g" de un insumo comprado por kg cuesta 0.15 kg
+        items_por_id = {i.id: i for i in inventario}
+        precio_insumo = {i.id: i.costo_base for i in inventario}
+        costo_plato = {}
+        for p in platos:
+            receta = receta_en_base(p, items_por_id)
+            costo = sum(cant * precio_insumo.get(insumo_id, 0.0) for insumo_id, cant in receta.items())
+            costo_plato[p.nombre] = costo  # Líneas antiguas sin plato_id
+            if p.id:
+                costo_plato[p.id] = costo
+
+        self._costo_plato = costo_plato
+        self.hay_costos = any(costo > 0 for costo in costo_plato.values())
+        self._firma = firma
+        return True
+
+    def costo_plato(self, clave: str) -> float:
+        return self._costo_plato.get(clave, 0.0)
+
+    def _vector_costos(self, ventas: VentasColumnar) -> np.ndarray:
+        """Costo unitario alineado con los códigos de plato del almacén columnar."""
+        return np.array([self._costo_plato.get(clave, self._costo_plato.get(nombre, 0.0))
+                         for clave, nombre in zip(ventas.plato_ids, ventas.plato_nombres)], dtype=np.float64)
+
+    # --- COGS VECTORIZADO ---
+    def costo_por_pedido(self, ventas: VentasColumnar, desde: Optional[date] = None, hasta: Optional[date] = None) -> np.ndarray:
+        """Costo de cada pedido (índice = fila del pedido en el almacén columnar)."""
+        filas, platos, cant, _ = ventas.lineas(desde, hasta)
+        costos = self._vector_costos(ventas)
+        return np.bincount(filas, weights=cant * costos[platos], minlength=ventas.n_pedidos)
+
+    def costo_total(self, ventas: VentasColumnar, desde: Optional[date] = None, hasta: Optional[date] = None) -> float:
+        _, platos, cant, _ = ventas.lineas(desde, hasta)
+        return float((cant * self._vector_costos(ventas)[platos]).sum())
+
+    def margen_por_plato(self, ventas: VentasColumnar, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[dict]:
+        """Unidades, ingreso, costo y margen de cada plato en una sola pasada."""
+        _, platos, cant, precio = ventas.lineas(desde, hasta)
+        n = len(ventas.plato_ids)
+        unidades = np.bincount(platos, weights=cant, minlength=n)
+        ingreso = np.bincount(platos, weights=cant * precio, minlength=n)
+        costo = unidades * self._vector_costos(ventas)[:n]
+
+        resultado = []
+        for i in np.argsort(ingreso - costo)[::-1]:
+            if unidades[i] <= 0:
+                continue
+            resultado.append({
+                "plato": ventas.plato_nombres[i],
+                "unidades": float(unidades[i]),
+                "ingreso": float(ingreso[i]),
+                "costo": float(costo[i]),
+                "margen": float(ingreso[i] - costo[i]),
+                "margen_pct": float((ingreso[i] - costo[i]) / ingreso[i] * 100) if ingreso[i] else 0.0
+            })
+        return resultado
@@ -0,0 +1,119 @@
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+from domain.resumen_diario import clave_dia
+
+class _BucketDia:
+    """Acumulados de un día; se pueden restar al borrar un pedido."""
+    __slots__ = ("num_pedidos", "ingreso", "tickets", "unidades", "clientes")
+
+    def __init__(self):
+        self.num_pedidos = 0
+        self.ingreso = 0.0
+        self.tickets = Counter()   # total -> veces (min/max que soportan borrados)
+        self.unidades = Counter()  # nombre de plato -> unidades
+        self.clientes = Counter()  # cliente -> pedidos del día
+
+def _sumar(contador: Counter, clave, n):
+    """Suma en un Counter y borra la clave al llegar a cero (min/max y conteos quedan limpios)."""
+    contador[clave] += n
+    if contador[clave] <= 0:
+        del contador[clave]
+
+class KpiAggregator:
+    """
+    KPIs financieros calculados pedido a pedido.
+    Cada pedido nuevo suma a los acumulados y cada borrado los resta, así un
+    refresco del dashboard solo combina los días del periodo, sin recorrer el historial.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._pedidos: Dict[str, tuple] = {}  # id -> (dia, total, cliente, unidades) para poder restar
+            self._dias: Dict[str, _BucketDia] = {}
+            self.num_pedidos = 0
+            self.ingreso_bruto = 0.0
+            self.unidades = Counter()
+            self.clientes = Counter()
+
+    # --- INGESTA ---
+    def agregar(self, pedido: dict):
+        pedido_id = pedido.get("id")
+        unidades = Counter()
+        for item in pedido.get("items", []):
+            unidades[item.get("nombre", "Item")] += item.get("cantidad", 0)
+        registro = (clave_dia(pedido.get("creado_en")), float(pedido.get("total", 0.0)),
+                    pedido.get("cliente_id") or pedido.get("cliente_nombre", "Anon"), unidades)
+
+        with self._lock:
+            if pedido_id in self._pedidos:
+                # Re-sincronizado: se reemplaza, no se cuenta dos veces
+                self._aplicar(self._pedidos.pop(pedido_id), -1)
+            self._pedidos[pedido_id] = registro
+            self._aplicar(registro, 1)
+
+    def quitar(self, pedido_id: str):
+        with self._lock:
+            registro = self._pedidos.pop(pedido_id, None)
+            if registro:
+                self._aplicar(registro, -1)
+
+    def _aplicar(self, registro: tuple, signo: int):
+        dia, total, cliente, unidades = registro
+        bucket = self._dias.setdefault(dia, _BucketDia())
+
+        self.num_pedidos += signo
+        self.ingreso_bruto += signo * total
+        bucket.num_pedidos += signo
+        bucket.ingreso += signo * total
+        _sumar(bucket.tickets, total, signo)
+        _sumar(bucket.clientes, cliente, signo)
+        _sumar(self.clientes, cliente, signo)
+        for nombre, cant in unidades.items():
+            _sumar(bucket.unidades, nombre, signo * cant)
+            _sumar(self.unidades, nombre, signo * cant)
+
+        if bucket.num_pedidos <= 0:
+            del self._dias[dia]
+
+    # --- CONSULTA ---
+    def top_platos(self, n: int = 5):
+        with self._lock:
+            return self.unidades.most_common(n)
+
+    def reporte(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> Dict[str, Any]:
+        """KPIs entre dos días 'YYYY-MM-DD' (inclusive) combinando solo esos buckets."""
+        with self._lock:
+            dias = [d for d in self._dias if (not desde or d >= desde) and (not hasta or d <= hasta)]
+
+            unidades = Counter()
+            clientes = set()
+            ventas_por_fecha = {}
+            num_pedidos = 0
+            ingreso_bruto = 0.0
+            minimos, maximos = [], []
+
+            for dia in dias:
+                bucket = self._dias[dia]
+                num_pedidos += bucket.num_pedidos
+                ingreso_bruto += bucket.ingreso
+                ventas_por_fecha[dia] = bucket.ingreso
+                if bucket.tickets:
+                    minimos.append(min(bucket.tickets))
+                    maximos.append(max(bucket.tickets))
+                unidades.update(bucket.unidades)
+                clientes.update(bucket.clientes)
+
+        return {
+            "num_pedidos": num_pedidos,
+            "ingreso_bruto": ingreso_bruto,
+            "ticket_min": min(minimos, default=0),
+            "ticket_max": max(maximos, default=0),
+            "ventas_por_fecha": ventas_por_fecha,
+            "unidades": unidades,
+            "clientes_unicos": len(clientes)
+        }
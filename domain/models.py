@@ -1,5 +1,46 @@
+import hashlib
+import re
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+# --- UNIDADES DE MEDIDA ---
+@dataclass(frozen=True)
+class Unidad:
+    nombre: str
+    base: str      # Unidad canónica de su dimensión: "g", "ml" o "unidad"
+    factor: float  # Cuántas unidades base hay en 1 de esta unidad
+
+UNIDADES: Dict[str, Unidad] = {}
+
+def registrar_unidad(nombre: str, base: str, factor: float, *alias: str):
+    u = Unidad(nombre, base, factor)
+    for clave in (nombre,) + alias:
+        UNIDADES[clave] = u
+
+registrar_unidad("g", "g", 1.0, "gr", "grs", "gramo", "gramos")
+registrar_unidad("kg", "g", 1000.0, "kgs", "kilo", "kilos", "kilogramo", "kilogramos")
+registrar_unidad("mg", "g", 0.001)
+registrar_unidad("lb", "g", 453.592, "libra", "libras")
+registrar_unidad("ml", "ml", 1.0, "cc", "mililitro", "mililitros")
+registrar_unidad("lt", "ml", 1000.0, "l", "lts", "litro", "litros")
+registrar_unidad("unidad", "unidad", 1.0, "u", "un", "und", "unid", "unidades", "pza", "pzas", "pieza", "piezas")
+registrar_unidad("docena", "unidad", 12.0, "docenas")
+
+def unidad(nombre: Optional[str]) -> Unidad:
+    """Busca la unidad en el registro; una unidad desconocida es su propia base (se cuenta tal cual)."""
+    clave = (nombre or "unidad").strip().lower()
+    return UNIDADES.get(clave) or Unidad(clave, clave, 1.0)
+
+_CANTIDAD_TEXTO = re.compile(r"^\s*([0-9]+(?:[.,][0-9]+)?)\s*([^\s0-9].*?)?\s*$")
+
+def parsear_cantidad(valor: Any) -> Tuple[float, Optional[str]]:
+    """Acepta 0.15 o textos como "150 g" / "1,5 kg". Devuelve (cantidad, unidad o None)."""
+    if isinstance(valor, (int, float)):
+        return float(valor), None
+    m = _CANTIDAD_TEXTO.match(str(valor))
+    if not m:
+        raise ValueError(f"Cantidad no reconocida: {valor!r}")
+    return float(m.group(1).replace(",", ".")), m.group(2)
 
 @dataclass
 class Plato:
@@ -7,7 +48,8 @@ class Plato:
     nombre: str
     precio: float
     descripcion: str = ""
-    insumos: Dict[str, float] = field(default_factory=dict)
+    # insumo_id -> cantidad por unidad vendida: número (en la unidad del insumo) o texto con unidad ("150 g")
+    insumos: Dict[str, Any] = field(default_factory=dict)
     imagen_path: Optional[str] = None
 
     @classmethod
@@ -17,7 +59,7 @@ class Plato:
             nombre=data.get("nombre", "N/A"),
             precio=float(data.get("precio", 0.0)),
             descripcion=data.get("descripcion", ""),
-            insumos=data.get("insumos", {}),
+            insumos={k: v if isinstance(v, str) else float(v) for k, v in data.get("insumos", {}).items()},
             imagen_path=data.get("imagen_path", None)
         )
 
@@ -35,22 +77,37 @@ class Cliente:
     id: Optional[str] # <--- Arreglado
     nombre: str
     email: str
-    historial_pedidos: List[str] = field(default_factory=list)
+    # El historial se consulta en 'pedidos' por cliente_id; aquí solo contador y última visita
+    num_pedidos: int = 0
+    ultima_visita: Optional[Any] = None
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any], doc_id: str):
+        # Documento sin migrar: el arreglo viejo más lo que ya sumaron las ventas nuevas
+        num_pedidos = len(data.get("historial_pedidos", [])) + (data.get("num_pedidos") or 0)
         return cls(
             id=doc_id,
             nombre=data.get("nombre", "N/A"),
             email=data.get("email", "N/A"),
-            historial_pedidos=data.get("historial_pedidos", [])
+            num_pedidos=int(num_pedidos),
+            ultima_visita=data.get("ultima_visita")
         )
+
+    @staticmethod
+    def normalizar_email(email: str) -> str:
+        return email.strip().lower()
+
+    @staticmethod
+    def id_desde_email(email: str) -> str:
+        """ID de documento fijo por cliente: la búsqueda es un get() y no una consulta."""
+        return hashlib.sha1(Cliente.normalizar_email(email).encode("utf-8")).hexdigest()
     
     def to_dict(self):
         return {
             "nombre": self.nombre,
             "email": self.email,
-            "historial_pedidos": self.historial_pedidos
+            "num_pedidos": self.num_pedidos,
+            "ultima_visita": self.ultima_visita
         }
 
 @dataclass
@@ -59,6 +116,10 @@ class InventarioItem:
     nombre: str
     cantidad: float
     unidad: str 
+    costo_unitario: float = 0.0  # Precio de compra por 'unidad'
+    minimo: float = 0.0          # Stock de seguridad (por debajo hay que reponer)
+    # Equivalencias propias del insumo: 1 'unidad' del ítem = X de otra unidad (ej. lechuga: {"g": 400})
+    conversiones: Dict[str, float] = field(default_factory=dict)
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any], doc_id: str):
@@ -66,16 +127,62 @@ class InventarioItem:
             id=doc_id,
             nombre=data.get("nombre", "N/A"),
             cantidad=float(data.get("cantidad", 0.0)),
-            unidad=data.get("unidad", "unidad")
+            unidad=data.get("unidad", "unidad"),
+            costo_unitario=float(data.get("costo_unitario", 0.0)),
+            minimo=float(data.get("minimo", 0.0)),
+            conversiones={k: float(v) for k, v in data.get("conversiones", {}).items()}
         )
 
     def to_dict(self):
         return {
             "nombre": self.nombre,
             "cantidad": self.cantidad,
-            "unidad": self.unidad
+            "unidad": self.unidad,
+            "costo_unitario": self.costo_unitario,
+            "minimo": self.minimo,
+            "conversiones": self.conversiones
         }
 
+    # --- UNIDADES BASE (g, ml o unidad): así se comparan y calculan las cantidades ---
+    @property
+    def unidad_base(self) -> str:
+        return unidad(self.unidad).base
+
+    @property
+    def factor_base(self) -> float:
+        return unidad(self.unidad).factor
+
+    @property
+    def cantidad_base(self) -> float:
+        return self.cantidad * self.factor_base
+
+    @property
+    def minimo_base(self) -> float:
+        return self.minimo * self.factor_base
+
+    @property
+    def costo_base(self) -> float:
+        """Costo de una unidad base (ej. por gramo si el insumo se compra por kg)."""
+        return self.costo_unitario / self.factor_base
+
+    def a_base(self, cantidad: float, nombre_unidad: Optional[str] = None) -> float:
+        """Convierte una cantidad (por defecto en la unidad del ítem) a su unidad base."""
+        if nombre_unidad is None:
+            return cantidad * self.factor_base
+        origen = unidad(nombre_unidad)
+        if origen.base == self.unidad_base:
+            return cantidad * origen.factor
+        # Otra dimensión (ej. gramos de un insumo contado por unidad): equivalencia del ítem
+        for nombre_conv, por_unidad in self.conversiones.items():
+            conv = unidad(nombre_conv)
+            if conv.base == origen.base and por_unidad > 0:
+                return cantidad * origen.factor / (por_unidad * conv.factor) * self.factor_base
+        raise ValueError(f"No se puede convertir {nombre_unidad} a {self.unidad} para '{self.nombre}'")
+
+    def desde_base(self, cantidad_base: float) -> float:
+        """Cantidad en unidades base expresada en la unidad del ítem (la que se guarda en Firestore)."""
+        return cantidad_base / self.factor_base
+
 @dataclass
 class Empleado:
     uid: str
@@ -0,0 +1,35 @@
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+# Opciones del selector de periodo del dashboard
+PERIODOS = ["Hoy", "Última Semana", "Mes Actual", "Año Completo", "Personalizado"]
+
+def rango_periodo(periodo: str, hoy: Optional[date] = None,
+                  desde: Optional[date] = None, hasta: Optional[date] = None) -> Tuple[date, date]:
+    """Días (inclusive) que cubre un periodo del dashboard."""
+    hoy = hoy or date.today()
+
+    if periodo == "Hoy":
+        return hoy, hoy
+    if periodo == "Última Semana":
+        return hoy - timedelta(days=6), hoy
+    if periodo == "Año Completo":
+        return hoy.replace(month=1, day=1), hoy
+    if periodo == "Personalizado":
+        if not desde or not hasta:
+            raise ValueError("El periodo personalizado necesita fecha inicial y final.")
+        if desde > hasta:
+            desde, hasta = hasta, desde
+        return desde, hasta
+
+    # "Mes Actual" y cualquier valor desconocido
+    return hoy.replace(day=1), hoy
+
+def limites_datetime(desde: date, hasta: date) -> Tuple[datetime, datetime]:
+    """[inicio del primer día, inicio del día siguiente al último) para consultar 'creado_en'."""
+    inicio = datetime(desde.year, desde.month, desde.day)
+    fin = datetime(hasta.year, hasta.month, hasta.day) + timedelta(days=1)
+    return inicio, fin
+
+def parsear_fecha(texto: str) -> date:
+    return datetime.strptime(texto.strip(), "%Y-%m-%d").date()
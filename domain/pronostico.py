@@ -0,0 +1,99 @@
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from domain.ventas_columnar import VentasColumnar
+
+class PronosticoDemanda:
+    """
+    Pronóstico de unidades por plato: suavizado exponencial del nivel con
+    estacionalidad por día de la semana (multiplicativa).
+    Todos los platos se ajustan a la vez (una columna por plato) y el modelo
+    se actualiza solo con los días que se cerraron desde el último ajuste.
+    """
+
+    def __init__(self, alpha: float = 0.3, gamma: float = 0.1, dias_inicio: int = 14):
+        self.alpha = alpha            # Peso del día nuevo en el nivel
+        self.gamma = gamma            # Peso del día nuevo en el factor del día de la semana
+        self.dias_inicio = dias_inicio
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.nivel = np.zeros(0)           # (platos,)
+        self.estacional = np.ones((7, 0))  # (día de la semana, platos)
+        self.ultimo_dia: Optional[date] = None  # Último día cerrado ya incorporado
+
+    # --- AJUSTE INCREMENTAL ---
+    def actualizar(self, ventas: VentasColumnar, hoy: Optional[date] = None):
+        """Incorpora los días cerrados (anteriores a hoy) que el modelo todavía no vio."""
+        hoy = hoy or date.today()
+        ayer = hoy - timedelta(days=1)
+
+        with self._lock:
+            if self.ultimo_dia is None:
+                primero = ventas.primer_dia()
+                if primero is None or primero > ayer:
+                    return
+                matriz = ventas.matriz_unidades_diarias(primero, ayer)
+                self._inicializar(matriz, primero)
+                self._recorrer(matriz, primero)
+            elif self.ultimo_dia < ayer:
+                desde = self.ultimo_dia + timedelta(days=1)
+                matriz = ventas.matriz_unidades_diarias(desde, ayer)
+                self._ampliar_platos(matriz.shape[1])
+                self._recorrer(matriz, desde)
+            else:
+                return
+            self.ultimo_dia = ayer
+
+    def _inicializar(self, matriz: np.ndarray, primer_dia: date):
+        """Nivel = promedio de las primeras semanas; factor = promedio del día de la semana / promedio general."""
+        muestra = matriz[:self.dias_inicio]
+        self.nivel = muestra.mean(axis=0)
+
+        dias_semana = np.array([(primer_dia + timedelta(days=i)).weekday() for i in range(len(muestra))])
+        estacional = np.ones((7, matriz.shape[1]))
+        for wd in range(7):
+            filas = muestra[dias_semana == wd]
+            if len(filas):
+                estacional[wd] = np.divide(filas.mean(axis=0), self.nivel, out=np.ones(matriz.shape[1]), where=self.nivel > 0)
+        self.estacional = estacional
+
+    def _ampliar_platos(self, n_platos: int):
+        """Platos nuevos en el menú: arrancan sin nivel y sin estacionalidad."""
+        faltan = n_platos - len(self.nivel)
+        if faltan > 0:
+            self.nivel = np.concatenate([self.nivel, np.zeros(faltan)])
+            self.estacional = np.concatenate([self.estacional, np.ones((7, faltan))], axis=1)
+
+    def _recorrer(self, matriz: np.ndarray, primer_dia: date):
+        # Un paso por día; cada paso actualiza todos los platos a la vez
+        wd0 = primer_dia.weekday()
+        for i, y in enumerate(matriz):
+            wd = (wd0 + i) % 7
+            s = self.estacional[wd]
+            desestacionalizado = np.divide(y, s, out=y.astype(float), where=s > 0)
+            nivel = self.alpha * desestacionalizado + (1 - self.alpha) * self.nivel
+            nuevo_s = np.divide(y, nivel, out=s.copy(), where=nivel > 0)
+            self.estacional[wd] = self.gamma * nuevo_s + (1 - self.gamma) * s
+            self.nivel = nivel
+
+    # --- PROYECCIÓN ---
+    def pronosticar(self, horizonte: int = 7, desde: Optional[date] = None) -> Tuple[List[date], np.ndarray]:
+        """Matriz (horizonte x platos) de unidades esperadas a partir del día siguiente al último cerrado."""
+        with self._lock:
+            if self.ultimo_dia is None:
+                return [], np.zeros((0, 0))
+            inicio = desde or (self.ultimo_dia + timedelta(days=1))
+            fechas = [inicio + timedelta(days=i) for i in range(horizonte)]
+            dias_semana = np.array([f.weekday() for f in fechas])
+            return fechas, self.nivel[np.newaxis, :] * self.estacional[dias_semana]
+
+    def resumen(self, ventas: VentasColumnar, horizonte: int = 7) -> Dict[str, float]:
+        """Unidades totales esperadas por plato (nombre) en el horizonte."""
+        _, matriz = self.pronosticar(horizonte)
+        if matriz.size == 0:
+            return {}
+        totales = matriz.sum(axis=0)
+        return {ventas.plato_nombres[i]: float(totales[i]) for i in np.argsort(totales)[::-1] if totales[i] > 0}
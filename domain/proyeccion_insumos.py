@@ -0,0 +1,49 @@
+from typing import Dict, List
+import numpy as np
+from domain.models import InventarioItem
+
+def proyectar_insumos(pronostico: np.ndarray, recetas: np.ndarray, inventario: List[InventarioItem]) -> List[Dict]:
+    """
+    Necesidad de insumos = pronóstico (días x platos) @ recetas (platos x insumos).
+    'inventario' debe venir en el mismo orden que las columnas de 'recetas'.
+    Se calcula en unidades base; el resultado se expresa en la unidad de cada insumo.
+    Devuelve por insumo: consumo proyectado, días de cobertura y cantidad sugerida a comprar,
+    ordenado del más urgente al menos urgente.
+    """
+    stock = np.array([item.cantidad_base for item in inventario], dtype=float)
+    factor = np.array([item.factor_base for item in inventario], dtype=float)
+    horizonte = pronostico.shape[0]
+    if horizonte == 0:
+        # Sin historial suficiente para pronosticar: se asume consumo cero
+        pronostico = np.zeros((1, recetas.shape[0]))
+        horizonte = 1
+
+    n_platos = min(pronostico.shape[1], recetas.shape[0])
+    necesidad_diaria = pronostico[:, :n_platos] @ recetas[:n_platos]   # (días x insumos)
+    acumulada = np.cumsum(necesidad_diaria, axis=0)
+    total = acumulada[-1]
+    promedio = total / horizonte
+
+    # Cobertura: primer día en que el consumo acumulado supera el stock;
+    # si alcanza para todo el horizonte, se extrapola con el consumo promedio
+    se_agota = acumulada > stock
+    dia_quiebre = np.where(se_agota.any(axis=0), se_agota.argmax(axis=0), -1)
+    extrapolada = np.divide(stock, promedio, out=np.full(len(inventario), np.inf), where=promedio > 0)
+    cobertura = np.where(dia_quiebre >= 0, dia_quiebre, extrapolada)
+    comprar = np.maximum(total - stock, 0)
+
+    resultado = []
+    for j in np.argsort(cobertura):
+        item = inventario[j]
+        resultado.append({
+            "insumo_id": item.id,
+            "nombre": item.nombre,
+            "unidad": item.unidad,
+            "stock": float(stock[j] / factor[j]),
+            "consumo_proyectado": float(total[j] / factor[j]),
+            "consumo_diario": float(promedio[j] / factor[j]),
+            "consumo_diario_base": float(promedio[j]),
+            "dias_cobertura": float(cobertura[j]),
+            "comprar": float(comprar[j] / factor[j])
+        })
+    return resultado
@@ -0,0 +1,102 @@
+from typing import Dict, Iterable, List
+import numpy as np
+from domain.models import Plato, InventarioItem, parsear_cantidad
+
+# Receta = Plato.insumos -> {insumo_id: cantidad por unidad vendida}
+# Las cantidades pueden venir con unidad ("150 g"); se convierten una sola vez al armar los índices
+
+def receta_en_base(plato: Plato, items_por_id: Dict[str, InventarioItem]) -> Dict[str, float]:
+    """
+    Receta con cada cantidad en la unidad base de su insumo (g, ml o unidad).
+    Un insumo que no está en el inventario se omite: sin él no se sabe a qué unidad convertir.
+    """
+    receta = {}
+    for insumo_id, valor in plato.insumos.items():
+        item = items_por_id.get(insumo_id)
+        if item is None:
+            print(f"Receta de '{plato.nombre}': insumo '{insumo_id}' no existe en inventario, se omite")
+            continue
+        try:
+            cantidad, nombre_unidad = parsear_cantidad(valor)
+            receta[insumo_id] = item.a_base(cantidad, nombre_unidad)
+        except ValueError as e:
+            print(f"Receta de '{plato.nombre}': {e}")
+    return receta
+
+def insumos_desconocidos(platos: List[Plato], inventario: List[InventarioItem]) -> Dict[str, List[str]]:
+    """Nombre de plato -> IDs de su receta que no existen en el inventario (recetas por corregir)."""
+    ids = {i.id for i in inventario}
+    faltantes = {}
+    for p in platos:
+        desconocidos = sorted(insumo_id for insumo_id in p.insumos if insumo_id not in ids)
+        if desconocidos:
+            faltantes[p.nombre] = desconocidos
+    return faltantes
+
+def recetas_por_plato(platos: List[Plato], inventario: List[InventarioItem]) -> Dict[str, Dict[str, float]]:
+    """
+    Índice plato_id -> receta, para expandir pedidos sin recorrer el menú.
+    Las cantidades quedan en la unidad con que se guarda cada insumo (lo que se descuenta en Firestore).
+    Los insumos que no están en el inventario se dejan fuera (receta_en_base): descontarlos fallaría la venta.
+    """
+    items_por_id = {i.id: i for i in inventario}
+    recetas = {}
+    for p in platos:
+        if not p.id or not p.insumos:
+            continue
+        receta = receta_en_base(p, items_por_id)
+        recetas[p.id] = {insumo_id: items_por_id[insumo_id].desde_base(cant) for insumo_id, cant in receta.items()}
+    return recetas
+
+def calcular_consumo_insumos(items: Iterable[dict], recetas: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """
+    Expande los items de un pedido por la receta de cada plato y suma
+    las cantidades por insumo (un solo valor por insumo para todo el pedido).
+    """
+    consumo: Dict[str, float] = {}
+    for item in items:
+        receta = recetas.get(item.get("plato_id"))
+        if not receta:
+            continue
+        cantidad = item.get("cantidad", 0)
+        for insumo_id, por_unidad in receta.items():
+            consumo[insumo_id] = consumo.get(insumo_id, 0.0) + por_unidad * cantidad
+    return {insumo_id: cant for insumo_id, cant in consumo.items() if cant > 0}
+
+class MatrizRecetas:
+    """
+    Matriz plato x insumo (cantidad en unidad base del insumo por unidad vendida),
+    alineada con los códigos de plato del almacén columnar. Se reconstruye solo si cambia el menú.
+    """
+
+    def __init__(self):
+        self._firma = None
+        self.matriz = np.zeros((0, 0))
+        self.insumo_ids: List[str] = []
+
+    def actualizar(self, platos: List[Plato], plato_claves: List[str], inventario: List[InventarioItem]) -> bool:
+        insumo_ids = [i.id for i in inventario]
+        firma = (tuple(sorted((p.id or "", p.nombre, tuple(sorted((k, str(v)) for k, v in p.insumos.items()))) for p in platos)),
+                 tuple(plato_claves), tuple((i.id, i.unidad, tuple(sorted(i.conversiones.items()))) for i in inventario))
+        if firma == self._firma:
+            return False
+
+        items_por_id = {i.id: i for i in inventario}
+        recetas = {}
+        for p in platos:
+            receta = receta_en_base(p, items_por_id)
+            recetas[p.nombre] = receta  # Líneas antiguas sin plato_id
+            if p.id:
+                recetas[p.id] = receta
+
+        columna = {insumo_id: j for j, insumo_id in enumerate(insumo_ids)}
+        matriz = np.zeros((len(plato_claves), len(insumo_ids)))
+        for i, clave in enumerate(plato_claves):
+            for insumo_id, cant in recetas.get(clave, {}).items():
+                if insumo_id in columna:
+                    matriz[i, columna[insumo_id]] = cant
+
+        self.matriz = matriz
+        self.insumo_ids = list(insumo_ids)
+        self._firma = firma
+        return True
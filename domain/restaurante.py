@@ -1,6 +1,10 @@
 from typing import List, Dict, Any, Optional
 from domain.models import Cliente
 import datetime
+import uuid
+
+# Espacio de nombres fijo para derivar IDs de pedido reproducibles
+_NAMESPACE_PEDIDOS = uuid.uuid5(uuid.NAMESPACE_URL, "restaurante/pedidos")
 
 class Pedido:
     # Usamos Optional[str] para permitir que el ID sea None al principio
@@ -11,6 +15,18 @@ class Pedido:
         self._items: List[Dict[str, Any]] = []
         self.total = 0.0
 
+    @classmethod
+    def nuevo(cls, cliente: Cliente):
+        """Pedido nuevo con su ID ya asignado (antes de tocar la red)."""
+        pedido = cls(cliente)
+        pedido.id = pedido.generar_id()
+        return pedido
+
+    def generar_id(self) -> str:
+        # Mismo cliente + mismo instante de apertura = mismo ID, en cualquier reintento
+        semilla = f"{self.cliente.id or self.cliente.email}|{self.creado_en.isoformat()}"
+        return uuid.uuid5(_NAMESPACE_PEDIDOS, semilla).hex
+
     def agregar_item(self, plato_id: str, nombre: str, precio_unitario: float, cantidad: int):
         if cantidad <= 0:
             raise ValueError("La cantidad debe ser positiva.")
@@ -35,7 +51,7 @@ class Pedido:
             "cliente_id": self.cliente.id,
             "cliente_nombre": self.cliente.nombre,
             "creado_en": self.creado_en,
-            "items": self._items,
+            "items": [dict(item) for item in self._items],  # Copia: el dict guardado no cambia con la UI
             "total": self.total
         }
 
@@ -0,0 +1,68 @@
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Tuple
+import numpy as np
+
+# Un documento por día en la colección 'resumen_diario' (ID = "YYYY-MM-DD")
+
+def clave_dia(fecha: Any) -> str:
+    """Convierte 'creado_en' (datetime de Python o de Firestore) en la clave del día."""
+    if isinstance(fecha, (datetime, date)):
+        return fecha.strftime("%Y-%m-%d")
+    if fecha:
+        return str(fecha).split(" ")[0]
+    return datetime.now().strftime("%Y-%m-%d")
+
+def hora_del_dia(fecha: Any) -> str:
+    """Hora (0-23) de 'creado_en' como clave de mapa de Firestore; mismo criterio de hora de pared que clave_dia."""
+    if isinstance(fecha, datetime):
+        return str(fecha.hour)
+    return str(datetime.now().hour)
+
+def resumen_vacio(dia: str) -> Dict[str, Any]:
+    return {
+        "fecha": dia,
+        "num_pedidos": 0,
+        "ingreso_bruto": 0.0,
+        "ticket_min": None,
+        "ticket_max": None,
+        "unidades": {},
+        "horas_pedidos": {},  # "13" -> pedidos de esa hora
+        "horas_ingreso": {}   # "13" -> ingreso de esa hora
+    }
+
+def acumular_resumenes(pedidos: Iterable[dict]) -> Dict[str, Dict[str, Any]]:
+    """Calcula los resúmenes diarios desde pedidos crudos (reconstrucción inicial)."""
+    resumenes: Dict[str, Dict[str, Any]] = {}
+    for p in pedidos:
+        dia = clave_dia(p.get("creado_en"))
+        r = resumenes.setdefault(dia, resumen_vacio(dia))
+        total = float(p.get("total", 0.0))
+        r["num_pedidos"] += 1
+        r["ingreso_bruto"] += total
+        r["ticket_min"] = total if r["ticket_min"] is None else min(r["ticket_min"], total)
+        r["ticket_max"] = total if r["ticket_max"] is None else max(r["ticket_max"], total)
+        hora = hora_del_dia(p.get("creado_en"))
+        r["horas_pedidos"][hora] = r["horas_pedidos"].get(hora, 0) + 1
+        r["horas_ingreso"][hora] = r["horas_ingreso"].get(hora, 0.0) + total
+        for item in p.get("items", []):
+            nombre = item.get("nombre", "Item")
+            r["unidades"][nombre] = r["unidades"].get(nombre, 0) + item.get("cantidad", 0)
+    return resumenes
+
+def matriz_semana_hora(resumenes: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pedidos e ingreso en matrices 7x24 (fila 0 = lunes) sumando los buckets por hora de cada día.
+    Usa solo los resúmenes: no hace falta leer pedidos.
+    """
+    pedidos = np.zeros((7, 24))
+    ingreso = np.zeros((7, 24))
+    for r in resumenes:
+        try:
+            dia_semana = datetime.strptime(r.get("fecha", ""), "%Y-%m-%d").weekday()
+        except ValueError:
+            continue
+        for hora, n in r.get("horas_pedidos", {}).items():
+            pedidos[dia_semana, int(hora)] += n
+        for hora, monto in r.get("horas_ingreso", {}).items():
+            ingreso[dia_semana, int(hora)] += monto
+    return pedidos, ingreso
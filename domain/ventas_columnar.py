@@ -0,0 +1,256 @@
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_DIA = date(1970, 1, 1)
+
+def _segundos(creado_en) -> int:
+    """Segundos desde 1970 de la hora de pared del pedido (igual criterio que clave_dia)."""
+    if isinstance(creado_en, datetime):
+        return int((creado_en.replace(tzinfo=None) - _EPOCH).total_seconds())
+    return int((datetime.now() - _EPOCH).total_seconds())
+
+def dia_a_numero(d: date) -> int:
+    return (d - _EPOCH_DIA).days
+
+def numero_a_dia(n: int) -> date:
+    return _EPOCH_DIA + timedelta(days=int(n))
+
+class VentasColumnar:
+    """
+    Pedidos y líneas de pedido en columnas NumPy.
+    Se construye una vez desde la copia local de pedidos y crece agregando al final;
+    un pedido re-sincronizado se sobreescribe en su misma fila.
+    Las agregaciones (por plato, por día, percentiles, top-N) son operaciones vectorizadas.
+    """
+
+    # Compactar las líneas cuando las descartadas pasan de este mínimo y de la mitad del total
+    MIN_LINEAS_COMPACTAR = 1024
+
+    def __init__(self, capacidad: int = 1024):
+        self._lock = threading.Lock()
+        self._capacidad_inicial = capacidad
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            cap = self._capacidad_inicial
+            # Columnas de pedidos
+            self.n_pedidos = 0
+            self.ts = np.zeros(cap, dtype=np.int64)          # segundos (hora de pared)
+            self.total = np.zeros(cap, dtype=np.float64)
+            self.activo = np.zeros(cap, dtype=bool)          # False = borrado
+            self._ids: List[str] = []
+            self._indice: Dict[str, int] = {}
+
+            # Columnas de líneas
+            self.n_lineas = 0
+            self.linea_pedido = np.zeros(cap, dtype=np.int32)
+            self.linea_plato = np.zeros(cap, dtype=np.int32)
+            self.linea_cant = np.zeros(cap, dtype=np.float64)
+            self.linea_precio = np.zeros(cap, dtype=np.float64)
+            self._rango_lineas: Dict[int, Tuple[int, int]] = {}  # fila -> (primera línea, cuántas)
+            self._lineas_muertas = 0  # Cantidad en cero que quedaron de versiones anteriores
+
+            # Diccionario de platos: código -> (plato_id, nombre)
+            self.plato_ids: List[str] = []
+            self.plato_nombres: List[str] = []
+            self._codigo_plato: Dict[str, int] = {}
+
+    # --- INGESTA (misma interfaz que los oyentes de PedidosCache) ---
+    def agregar(self, pedido: dict):
+        items = pedido.get("items", [])
+        with self._lock:
+            fila = self._indice.get(pedido.get("id"))
+            if fila is None:
+                fila = self.n_pedidos
+                self._crecer_pedidos(fila + 1)
+                self._ids.append(pedido.get("id"))
+                self._indice[pedido.get("id")] = fila
+                self.n_pedidos += 1
+
+            # Re-sincronizado: se sobreescribe la misma fila, no se agrega otra
+            self.ts[fila] = _segundos(pedido.get("creado_en"))
+            self.total[fila] = float(pedido.get("total", 0.0))
+            self.activo[fila] = True
+
+            inicio, cuantas = self._rango_lineas.get(fila, (self.n_lineas, 0))
+            if len(items) > cuantas:
+                # No caben en su lugar: las viejas quedan en cero y las nuevas van al final
+                self._descartar_lineas(fila)
+                inicio = self.n_lineas
+                self._crecer_lineas(inicio + len(items))
+                self.n_lineas += len(items)
+            else:
+                self._anular(inicio + len(items), inicio + cuantas)
+            self._rango_lineas[fila] = (inicio, len(items))
+
+            for l, item in enumerate(items, start=inicio):
+                self.linea_pedido[l] = fila
+                self.linea_plato[l] = self._codigo(item)
+                self.linea_cant[l] = item.get("cantidad", 0)
+                self.linea_precio[l] = item.get("precio_unitario", 0.0)
+            self._compactar_si_conviene()
+
+    def quitar(self, pedido_id: str):
+        with self._lock:
+            fila = self._indice.pop(pedido_id, None)
+            if fila is not None:
+                self.activo[fila] = False
+                self._descartar_lineas(fila)
+                self._compactar_si_conviene()
+
+    def _descartar_lineas(self, fila: int):
+        inicio, cuantas = self._rango_lineas.pop(fila, (0, 0))
+        self._anular(inicio, inicio + cuantas)
+
+    def _anular(self, desde: int, hasta: int):
+        """Líneas sin efecto en ninguna suma (cantidad y precio en cero) hasta la próxima compactación."""
+        self.linea_cant[desde:hasta] = 0
+        self.linea_precio[desde:hasta] = 0
+        self._lineas_muertas += max(hasta - desde, 0)
+
+    def _compactar_si_conviene(self):
+        if self._lineas_muertas < max(self.MIN_LINEAS_COMPACTAR, self.n_lineas // 2):
+            return
+        # Se copian solo los rangos vivos, en el mismo orden; las filas de pedido no cambian
+        rangos = sorted(self._rango_lineas.items(), key=lambda kv: kv[1][0])
+        vivas = np.concatenate([np.arange(inicio, inicio + cuantas) for _, (inicio, cuantas) in rangos]) \
+            if rangos else np.zeros(0, dtype=np.int64)
+        self.linea_pedido[:vivas.size] = self.linea_pedido[vivas]
+        self.linea_plato[:vivas.size] = self.linea_plato[vivas]
+        self.linea_cant[:vivas.size] = self.linea_cant[vivas]
+        self.linea_precio[:vivas.size] = self.linea_precio[vivas]
+
+        nuevo_inicio = 0
+        for fila, (_, cuantas) in rangos:
+            self._rango_lineas[fila] = (nuevo_inicio, cuantas)
+            nuevo_inicio += cuantas
+        self.n_lineas = int(vivas.size)
+        self._lineas_muertas = 0
+
+    def _codigo(self, item: dict) -> int:
+        clave = item.get("plato_id") or item.get("nombre", "Item")
+        codigo = self._codigo_plato.get(clave)
+        if codigo is None:
+            codigo = len(self.plato_ids)
+            self._codigo_plato[clave] = codigo
+            self.plato_ids.append(clave)
+            self.plato_nombres.append(item.get("nombre", clave))
+        return codigo
+
+    def _crecer_pedidos(self, necesario: int):
+        if necesario <= len(self.ts):
+            return
+        cap = max(necesario, len(self.ts) * 2)
+        self.ts = _ampliar(self.ts, cap)
+        self.total = _ampliar(self.total, cap)
+        self.activo = _ampliar(self.activo, cap)
+
+    def _crecer_lineas(self, necesario: int):
+        if necesario <= len(self.linea_pedido):
+            return
+        cap = max(necesario, len(self.linea_pedido) * 2)
+        self.linea_pedido = _ampliar(self.linea_pedido, cap)
+        self.linea_plato = _ampliar(self.linea_plato, cap)
+        self.linea_cant = _ampliar(self.linea_cant, cap)
+        self.linea_precio = _ampliar(self.linea_precio, cap)
+
+    # --- VISTAS (copias baratas para trabajar fuera del lock) ---
+    def _pedidos_en_rango(self, desde: Optional[date], hasta: Optional[date]):
+        """Máscara de pedidos activos dentro del rango de días (inclusive)."""
+        n = self.n_pedidos
+        dias = self.ts[:n] // 86400
+        mascara = self.activo[:n].copy()
+        if desde:
+            mascara &= dias >= dia_a_numero(desde)
+        if hasta:
+            mascara &= dias <= dia_a_numero(hasta)
+        return mascara, dias
+
+    def _lineas_de(self, mascara_pedidos):
+        m = self.n_lineas
+        filas = self.linea_pedido[:m]
+        seleccion = mascara_pedidos[filas]
+        return filas[seleccion], self.linea_plato[:m][seleccion], self.linea_cant[:m][seleccion], self.linea_precio[:m][seleccion]
+
+    def lineas(self, desde: Optional[date] = None, hasta: Optional[date] = None):
+        """Copias de (fila de pedido, código de plato, cantidad, precio) de las líneas activas del rango."""
+        with self._lock:
+            mascara, _ = self._pedidos_en_rango(desde, hasta)
+            return self._lineas_de(mascara)
+
+    def fila_de(self, pedido_id: str) -> Optional[int]:
+        with self._lock:
+            return self._indice.get(pedido_id)
+
+    def recientes(self, k: int = 10, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[str]:
+        """IDs de los k pedidos activos más recientes del rango (del más nuevo al más viejo)."""
+        with self._lock:
+            mascara, _ = self._pedidos_en_rango(desde, hasta)
+            filas = np.flatnonzero(mascara)
+            if filas.size > k:
+                filas = filas[np.argpartition(self.ts[filas], -k)[-k:]]
+            filas = filas[np.argsort(self.ts[filas])[::-1]]
+            return [self._ids[f] for f in filas]
+
+    def primer_dia(self) -> Optional[date]:
+        """Día del pedido activo más antiguo (None si no hay ventas)."""
+        with self._lock:
+            mascara, dias = self._pedidos_en_rango(None, None)
+            if not mascara.any():
+                return None
+            return numero_a_dia(dias[mascara].min())
+
+    # --- AGREGACIONES ---
+    def unidades_por_plato(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> np.ndarray:
+        """Unidades vendidas por código de plato (índice = código)."""
+        with self._lock:
+            mascara, _ = self._pedidos_en_rango(desde, hasta)
+            _, platos, cant, _ = self._lineas_de(mascara)
+            return np.bincount(platos, weights=cant, minlength=len(self.plato_ids))
+
+    def top_platos(self, n: int = 5, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[Tuple[str, float]]:
+        unidades = self.unidades_por_plato(desde, hasta)
+        orden = np.argsort(unidades)[::-1][:n]
+        return [(self.plato_nombres[i], float(unidades[i])) for i in orden if unidades[i] > 0]
+
+    def ventas_por_dia(self, desde: date, hasta: date) -> Tuple[List[date], np.ndarray]:
+        """Ingreso por día del rango, con ceros en los días sin ventas."""
+        with self._lock:
+            mascara, dias = self._pedidos_en_rango(desde, hasta)
+            offset = dias[mascara] - dia_a_numero(desde)
+            n_dias = (hasta - desde).days + 1
+            ventas = np.bincount(offset, weights=self.total[:self.n_pedidos][mascara], minlength=n_dias)
+        return [desde + timedelta(days=i) for i in range(n_dias)], ventas[:n_dias]
+
+    def matriz_unidades_diarias(self, desde: date, hasta: date) -> np.ndarray:
+        """Matriz (días x platos) de unidades vendidas; base de pronósticos y proyecciones."""
+        with self._lock:
+            mascara, dias = self._pedidos_en_rango(desde, hasta)
+            filas, platos, cant, _ = self._lineas_de(mascara)
+            n_dias = (hasta - desde).days + 1
+            n_platos = len(self.plato_ids)
+            offset = dias[filas] - dia_a_numero(desde)
+            plano = np.bincount(offset * n_platos + platos, weights=cant, minlength=n_dias * n_platos)
+        return plano[:n_dias * n_platos].reshape(n_dias, n_platos)
+
+    def percentiles_ticket(self, q=(50, 90), desde: Optional[date] = None, hasta: Optional[date] = None) -> List[float]:
+        with self._lock:
+            mascara, _ = self._pedidos_en_rango(desde, hasta)
+            totales = self.total[:self.n_pedidos][mascara]
+        if totales.size == 0:
+            return [0.0 for _ in q]
+        return [float(v) for v in np.percentile(totales, q)]
+
+    def ingreso_total(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> float:
+        with self._lock:
+            mascara, _ = self._pedidos_en_rango(desde, hasta)
+            return float(self.total[:self.n_pedidos][mascara].sum())
+
+def _ampliar(arreglo: np.ndarray, capacidad: int) -> np.ndarray:
+    nuevo = np.zeros(capacidad, dtype=arreglo.dtype)
+    nuevo[:len(arreglo)] = arreglo
+    return nuevo
@@ -8,6 +8,9 @@ import os
 from data.firebase_auth_service import AuthService
 from data.firestore_service import FirestoreService
 from data.gemini_service import GeminiService
+from data.pedidos_journal import PedidosJournal
+from data.cache_respuestas_ia import CacheRespuestasIA
+from data.planificador_ia import PlanificadorIA
 
 # ViewModels
 from presentation.login_vm import LoginViewModel
@@ -56,7 +59,14 @@ def main():
     
     # 3. Inteligencia Artificial (Gemini)
     # Le pasamos firestore_service para que pueda leer el historial
-    ia_service = GeminiService(firestore_service)
+    # Respuestas en disco: un prompt repetido no vuelve a la API (ni tras reiniciar)
+    ia_service = GeminiService(firestore_service, CacheRespuestasIA())
+    # Cola única hacia Gemini: hilos acotados, cuota por minuto y prioridad al chat
+    planificador_ia = PlanificadorIA()
+
+    # 4. Diario local de pedidos (la caja sigue vendiendo sin internet)
+    journal = PedidosJournal(firestore_service)
+    journal.iniciar()
 
     # --- C. INICIALIZAR VIEWMODELS (BUNDLE) ---
     # Creamos el paquete de lógica que usará la interfaz
@@ -64,15 +74,15 @@ def main():
         "login_vm": LoginViewModel(auth_service),
         
         # Pedidos: Usa Firestore para guardar y IA para recomendar
-        "pedidos_vm": PedidosViewModel(firestore_service, ia_service),
+        "pedidos_vm": PedidosViewModel(firestore_service, ia_service, journal),
         
         # Inventario: Usa Firestore para stock e IA para análisis
-        "inventario_vm": InventarioViewModel(firestore_service, ia_service), 
+        "inventario_vm": InventarioViewModel(firestore_service, ia_service, planificador_ia), 
         
         "empleados_vm": EmpleadosViewModel(auth_service),
         
         # Finanzas: Usa Firestore para historial e IA para análisis financiero potente
-        "finanzas_vm": FinanzasViewModel(firestore_service, ia_service),
+        "finanzas_vm": FinanzasViewModel(firestore_service, ia_service, planificador_ia),
         
         "historial_vm": HistorialPedidosViewModel(firestore_service)
     }
@@ -81,7 +91,7 @@ def main():
     print("Sistema iniciado correctamente. Abriendo ventana...")
     
     # Inicializamos la ventana principal pasando los ViewModels y el servicio de IA
-    app = AppUI(vm_bundle=vm_bundle, ia_service=ia_service)
+    app = AppUI(vm_bundle=vm_bundle, ia_service=ia_service, planificador=planificador_ia)
     
     # Bloqueo principal de la interfaz gráfica
     app.mainloop()
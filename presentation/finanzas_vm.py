@@ -1,50 +1,70 @@
 import threading
-from collections import Counter, defaultdict
-from datetime import datetime
+import numpy as np
 from .observable import Observable
+from domain.resumen_diario import clave_dia, matriz_semana_hora
+from domain.periodos import rango_periodo
+from domain.canasta import CanastaPlatos
 from data.firestore_service import FirestoreService
 from data.gemini_service import GeminiService
+from data.planificador_ia import PlanificadorIA
 
 class FinanzasViewModel:
-    def __init__(self, firestore_service: FirestoreService, gemini_service: GeminiService):
+    def __init__(self, firestore_service: FirestoreService, gemini_service: GeminiService, planificador: PlanificadorIA = None):
         self.fs = firestore_service
         self.gemini = gemini_service
+        # Todas las consultas a la IA pasan por la cola común (prioridad, cuota, fusión)
+        self.planificador = planificador or PlanificadorIA()
         
         
         self.reporte_finanzas = Observable({}) 
         self.transacciones = Observable([])      # Faltaba este
         self.graficos_data = Observable({})      # Faltaba este
+        self.pronostico = Observable({})         # Unidades esperadas por plato (próximos 7 días)
+        self.combos = Observable([])             # Pares de platos que se piden juntos
         
         self.mensaje = Observable("Listo.")
-        self.gemini_respuesta = Observable("Esperando consulta...")
+        # Respuesta del chat en partes: (id_consulta, "inicio" | "fragmento" | "fin", texto)
+        self.gemini_fragmento = Observable(None)
+        self._chat_id = 0
+        self._cancelar_chat = threading.Event()
         self.insight_flash = Observable(None) 
+        self._rango = (None, None)  # Periodo del último reporte (contexto del chat)
 
     
-    def generar_reporte_completo(self, periodo="Mes Actual"):
-        """Genera KPIs, Datos de Gráficos y Tabla de Transacciones"""
+    def generar_reporte_completo(self, periodo="Mes Actual", desde=None, hasta=None):
+        """Genera KPIs, Datos de Gráficos y Tabla de Transacciones del periodo elegido"""
+        try:
+            desde, hasta = rango_periodo(periodo, desde=desde, hasta=hasta)
+        except ValueError as e:
+            self.mensaje.value = str(e)
+            return
+        self._rango = (desde, hasta)
         self.mensaje.value = f"Analizando datos ({periodo})..."
         
         def run_report():
             try:
                 
-                pedidos = self.fs.get_all_pedidos() 
+                # KPIs y gráficos: acumulados incrementales; solo se baja lo que falta del periodo
+                self.fs.pedidos_cache.actualizar(desde)
+                resumen = self.fs.kpis.reporte(clave_dia(desde), clave_dia(hasta))
                 
+                total_pedidos = resumen["num_pedidos"]
+                ingreso_bruto = resumen["ingreso_bruto"]
                 
-                total_pedidos = len(pedidos)
-                ingreso_bruto = sum(p.get("total", 0.0) for p in pedidos)
                 
+                # Costo real: cada plato vendido explotado por su receta y el precio de sus insumos
+                costos = self.fs.actualizar_costos()
+                costo_por_pedido = costos.costo_por_pedido(self.fs.ventas, desde, hasta)
+                # Sin costos cargados el costo es desconocido (None), no cero: evita un margen del 100%
+                costos_totales = float(costo_por_pedido.sum()) if costos.hay_costos else None
+                ganancia_neta = ingreso_bruto - costos_totales if costos.hay_costos else None
                 
-                costos_totales = ingreso_bruto * 0.60 
-                ganancia_neta = ingreso_bruto - costos_totales
-                
-                
-                clientes_set = set(p.get("cliente", {}).get("nombre", "Anon") for p in pedidos)
-                clientes_unicos = len(clientes_set)
+                clientes_unicos = resumen["clientes_unicos"]
 
                 ingreso_promedio = ingreso_bruto / total_pedidos if total_pedidos > 0 else 0
-                tickets = [p.get("total", 0.0) for p in pedidos]
-                max_ticket = max(tickets, default=0)
-                min_ticket = min(tickets, default=0)
+                ticket_p50, ticket_p90 = self.fs.ventas.percentiles_ticket((50, 90), desde, hasta)
+                max_ticket = resumen["ticket_max"]
+                min_ticket = resumen["ticket_min"]
 
                 kpi_data = {
                     "total_pedidos": total_pedidos,
@@ -53,57 +73,60 @@ class FinanzasViewModel:
                     "ingreso_promedio": ingreso_promedio,
                     "max_ticket": max_ticket,
                     "min_ticket": min_ticket,
+                    "ticket_p50": ticket_p50,
+                    "ticket_p90": ticket_p90,
                     "clientes_unicos": clientes_unicos,
                     "costos_totales": costos_totales
                 }
                 
                 # --- B. DATOS PARA LA TABLA (TRANSACCIONES) ---
+                # Solo los campos de la tabla, sin los items de cada pedido
+                filas = self.fs.list_pedidos(["cliente_nombre", "total", "creado_en"], limite=50, desde=desde, hasta=hasta) # Últimos 50 para no saturar
                 lista_transacciones = []
-                for p in pedidos[-50:]: # Últimos 50 para no saturar
-                    total = p.get("total", 0)
-                    costo_estimado = total * 0.6 
+                for pedido_id, cliente_nombre, total, creado_en in filas:
+                    total = total or 0
+                    fila = self.fs.ventas.fila_de(pedido_id)
+                    # None = costo desconocido: sin costos cargados, o pedido que aún no está en las columnas
+                    # (llegó de otra terminal después de sincronizar); 0.0 mostraría un margen del 100%
+                    if costos.hay_costos and fila is not None and fila < len(costo_por_pedido):
+                        costo_estimado = float(costo_por_pedido[fila])
+                    else:
+                        costo_estimado = None
                     lista_transacciones.append({
-                        "fecha": p.get("fecha", "Hoy"),
-                        "pedido_id": str(p.get("id", "???"))[-6:], # ID corto
-                        "cliente": p.get("cliente", {}).get("nombre", "General"),
+                        "fecha": clave_dia(creado_en),
+                        "pedido_id": str(pedido_id)[-6:], # ID corto
+                        "cliente": cliente_nombre or "General",
                         "total": total,
                         "costo": costo_estimado,
-                        "ganancia": total - costo_estimado
+                        "ganancia": total - costo_estimado if costo_estimado is not None else None
                     })
                 
                 # --- C. DATOS PARA GRÁFICOS ---
-       
-                ventas_por_fecha = defaultdict(float)
-                for p in pedidos:
-                
-                    fecha_raw = p.get("fecha", str(datetime.now().date()))
-                    fecha_simple = fecha_raw.split(" ")[0] # Solo YYYY-MM-DD
-                    ventas_por_fecha[fecha_simple] += p.get("total", 0)
-                
-                fechas_ordenadas = sorted(ventas_por_fecha.keys())
-                ventas_ordenadas = [ventas_por_fecha[f] for f in fechas_ordenadas]
-
-                # 2. Top Productos (Agrupar items)
-                conteo_productos = Counter()
-                for p in pedidos:
-                    for item in p.get("items", []):
-                        nombre = item.get("nombre", "Item")
-                        cant = item.get("cantidad", 1)
-                        conteo_productos[nombre] += cant
-                
-                top_5 = conteo_productos.most_common(5) # Top 5
+                # Agregaciones vectorizadas sobre las columnas de ventas
+                fechas_ordenadas, ventas_ordenadas = self._serie_tendencia(*self.fs.ventas.ventas_por_dia(desde, hasta))
+
+                # 2. Top Productos
+                top_5 = self.fs.ventas.top_platos(5, desde, hasta) # Top 5
+
+                # 3. Mapa de calor día x hora: sale de los resúmenes diarios, no de los pedidos
+                resumenes = self.fs.get_resumenes_diarios(clave_dia(desde), clave_dia(hasta))
+                calor_pedidos, calor_ingreso = matriz_semana_hora(resumenes)
                 
                 graficos_payload = {
-                    "tendencias_fechas": fechas_ordenadas[-7:], # Últimos 7 días
-                    "tendencias_ventas": ventas_ordenadas[-7:],
+                    "tendencias_fechas": fechas_ordenadas,
+                    "tendencias_ventas": ventas_ordenadas,
                     "top_productos_nombres": [x[0] for x in top_5],
-                    "top_productos_cant": [x[1] for x in top_5]
+                    "top_productos_cant": [x[1] for x in top_5],
+                    "calor_pedidos": calor_pedidos,
+                    "calor_ingreso": calor_ingreso
                 }
 
                 # --- ACTUALIZAR OBSERVABLES (UI THREAD SAFE) ---
                 self.reporte_finanzas.value = kpi_data
                 self.transacciones.value = lista_transacciones
                 self.graficos_data.value = graficos_payload
+                self.pronostico.value = self.fs.pronosticar_demanda(7)
+                self.combos.value = CanastaPlatos.del_periodo(self.fs.ventas, desde, hasta).reglas(5)
                 self.mensaje.value = "Dashboard actualizado."
 
             except Exception as e:
@@ -112,6 +135,17 @@ class FinanzasViewModel:
 
         threading.Thread(target=run_report).start()
 
+    @staticmethod
+    def _serie_tendencia(fechas, ventas):
+        """Serie diaria del periodo (con días en cero); más de un mes se agrupa por mes."""
+        if len(fechas) <= 31:
+            return [clave_dia(f) for f in fechas], ventas.tolist()
+
+        meses = np.array([f.year * 12 + f.month - 1 for f in fechas])
+        claves, posicion = np.unique(meses, return_inverse=True)
+        por_mes = np.bincount(posicion, weights=ventas)
+        return [f"{c // 12}-{c % 12 + 1:02d}" for c in claves], por_mes.tolist()
+
     # --- Método para el Widget Automático (Insight Flash) ---
     def obtener_insight_automatico(self):
         """Genera un consejo estratégico corto basado en datos reales."""
@@ -147,22 +181,45 @@ class FinanzasViewModel:
             except Exception as e:
                 print(f"Error insight: {e}")
 
-        threading.Thread(target=run_insight).start()
+        # Trabajo de fondo: se descarta si el dashboard no está a la vista
+        self.planificador.enviar(run_insight, clave="insight_finanzas", vista="FinanzasView")
 
     # --- Chat con IA (Manual) ---
     def ask_gemini_question(self, prompt: str):
+        # Una pregunta nueva corta la respuesta que se esté escribiendo
+        self._cancelar_chat.set()
+        cancelar = threading.Event()
+        self._cancelar_chat = cancelar
+        self._chat_id += 1
+        chat_id = self._chat_id
+
+        def emitir(tipo, texto=""):
+            if not cancelar.is_set():
+                self.gemini_fragmento.value = (chat_id, tipo, texto)
+
         def run_query():
+            if cancelar.is_set():
+                return
+            emitir("inicio")
             try:
-                # Contexto completo para preguntas complejas
-                conteo, texto_ventas = self.gemini._obtener_datos_conteo_platos()
-                contexto = f"Datos Ventas:\n{texto_ventas}"
-                
-                full_prompt = f"{contexto}\n\nUsuario: {prompt}\nResponde como analista de negocios."
-                resp = self.gemini._generar_respuesta(full_prompt)
-                self.gemini_respuesta.value = resp
-                self.mensaje.value = "Análisis completado."
+                al_fragmento = lambda texto: emitir("fragmento", texto)
+                desde, hasta = self._rango
+                if self.gemini.modelo_herramientas:
+                    # El modelo pide solo las cifras que necesita (function calling sobre los agregados locales)
+                    periodo = f"(Periodo en pantalla: {desde} a {hasta})\n" if desde and hasta else ""
+                    self.gemini.responder_con_herramientas(f"{periodo}{prompt}", al_fragmento, cancelar)
+                else:
+                    # Contexto por niveles del periodo en pantalla, con tamaño acotado
+                    contexto = self.gemini.obtener_contexto_financiero_completo(1200, desde, hasta)
+                    full_prompt = f"{contexto}\n\nUsuario: {prompt}\nResponde como analista de negocios."
+                    self.gemini.generar_respuesta_stream(full_prompt, al_fragmento, cancelar)
+                if not cancelar.is_set():
+                    self.mensaje.value = "Análisis completado."
             except Exception as e:
-                self.gemini_respuesta.value = f"Error: {e}"
+                emitir("fragmento", f"Error: {e}")
+            finally:
+                emitir("fin")
         
         self.mensaje.value = "Consultando a Gemini..."
-        threading.Thread(target=run_query).start()
+        # Sin clave de fusión: cada pregunta tiene su propia cancelación
+        self.planificador.enviar(run_query, prioridad=PlanificadorIA.PRIORIDAD_CHAT)
@@ -1,28 +1,66 @@
+import threading
 from presentation.observable import Observable
 
 class HistorialPedidosViewModel:
+    TAM_PAGINA = 50
+    # La lista solo muestra esto; el pedido completo se pide al abrirlo
+    CAMPOS_LISTA = ["cliente_nombre", "total"]
 
     def __init__(self, firestore_service):
         self.db = firestore_service
 
         self.lista_pedidos = Observable([])
+        self.pedidos_agregados = Observable([])  # Página nueva al hacer scroll (se agrega al final)
         self.detalle_pedido_seleccionado = Observable([])
         self.mensaje = Observable("")
 
         self.selected_pedido_id = None
+        self._paginas = None
+        self._cargando = None  # Paginador con una página en camino: el scroll no pide otra
 
     # ----------------------------
-    # CARGAR PEDIDOS
+    # CARGAR PEDIDOS (POR PÁGINAS)
     # ----------------------------
     def cargar_historial_pedidos(self):
         try:
-            pedidos = self.db.get_all_pedidos_with_ids()
-            self.lista_pedidos.value = pedidos
+            paginas = self.db.iter_paginas_pedidos(self.TAM_PAGINA, campos=self.CAMPOS_LISTA)
+            self._paginas = paginas
+            self.lista_pedidos.value = next(paginas, [])
             self.detalle_pedido_seleccionado.value = []
             self.selected_pedido_id = None
         except Exception as e:
             self.mensaje.value = f"Error cargando historial: {e}"
 
+    def cargar_mas_pedidos(self):
+        """
+        Siguiente página; la vista la pide al acercarse al final de la lista.
+        La consulta corre en un hilo: 'pedidos_agregados' se notifica desde ese hilo.
+        """
+        paginas = self._paginas
+        if paginas is None or self._cargando is paginas:
+            return
+        self._cargando = paginas
+
+        def run_pagina():
+            try:
+                pagina = next(paginas, None)
+                if self._paginas is not paginas:
+                    return  # Se recargó la lista mientras tanto: esta página ya no aplica
+                if pagina is None:
+                    self._paginas = None  # No hay más pedidos
+                    return
+                self.lista_pedidos.value.extend(pagina)
+                self.pedidos_agregados.value = pagina
+            except Exception as e:
+                if self._paginas is paginas:
+                    self._paginas = None
+                    self.mensaje.value = f"Error cargando historial: {e}"
+            finally:
+                if self._cargando is paginas:
+                    self._cargando = None
+
+        threading.Thread(target=run_pagina, daemon=True).start()
+
     # ----------------------------
     # SELECCIONAR POR ID
     # ----------------------------
@@ -1,10 +1,13 @@
 from presentation.observable import Observable
 from domain.models import InventarioItem
+from domain.alertas_stock import evaluar_stock, frase_alerta
+from data.planificador_ia import PlanificadorIA
 
 class InventarioViewModel:
-    def __init__(self, firestore_service, ia_service):
+    def __init__(self, firestore_service, ia_service, planificador: PlanificadorIA = None):
         self.db = firestore_service
         self.ia = ia_service
+        self.planificador = planificador or PlanificadorIA()
         
         self.inventario_lista = Observable([])
         self.mensaje = Observable("")
@@ -22,17 +25,41 @@ class InventarioViewModel:
 
     def _set_recomendacion(self):
         items = self.inventario_lista.value
-        if items and self.ia:
-            nombre, frase = self.ia.obtener_recomendacion_inventario(items)
-            self.recomendacion.value = f"{frase} ({nombre})"
-        else:
+        if not items:
             self.recomendacion.value = "No hay recomendaciones disponibles."
+            return
 
-    def crear_nuevo_item(self, nombre, cantidad, unidad):
+        # 1. Reglas locales: la alerta aparece al instante
+        alertas = evaluar_stock(items)
+        self.recomendacion.value = frase_alerta(alertas)
+
+        # 2. En segundo plano: puntos de reorden con el consumo proyectado y redacción de la IA
+        def run_refinar():
+            try:
+                proyeccion = self.db.proyectar_insumos(7, items)
+                consumo = {p["insumo_id"]: p["consumo_diario_base"] for p in proyeccion}
+                refinadas = evaluar_stock(items, consumo)
+                self.recomendacion.value = frase_alerta(refinadas)
+
+                if refinadas and self.ia and self.ia.model:
+                    frase = self.ia.obtener_recomendacion_inventario(refinadas)
+                    if frase:
+                        self.recomendacion.value = f"{frase} ({refinadas[0]['nombre']})"
+            except Exception as e:
+                print(f"Error refinando alertas de stock: {e}")
+
+        # Misma foto de stock = mismo trabajo (recargas seguidas no duplican la consulta)
+        foto = tuple((i.id, i.cantidad, i.minimo) for i in items)
+        self.planificador.enviar(run_refinar, clave=("alerta_stock", foto), vista="InventarioView")
+
+    def crear_nuevo_item(self, nombre, cantidad, unidad, costo_unitario=0.0, minimo=0.0):
         try:
             cant_float = float(cantidad)
+            costo_float = float(costo_unitario or 0.0)
+            minimo_float = float(minimo or 0.0)
             
-            nuevo_item = InventarioItem(id=None, nombre=nombre, cantidad=cant_float, unidad=unidad)
+            nuevo_item = InventarioItem(id=None, nombre=nombre, cantidad=cant_float, unidad=unidad,
+                                        costo_unitario=costo_float, minimo=minimo_float)
             
             # Guardar en BD
             self.db.add_inventario_item(nuevo_item)
@@ -40,16 +67,32 @@ class InventarioViewModel:
             self.mensaje.value = f" Ítem '{nombre}' agregado correctamente."
             self.cargar_inventario() # Recargar lista visual
         except ValueError:
-            self.mensaje.value = "Error: La cantidad debe ser numérica."
+            self.mensaje.value = "Error: La cantidad, el costo y el mínimo deben ser numéricos."
         except Exception as e:
             self.mensaje.value = f"Error al crear: {e}"
 
     def actualizar_stock(self, item: InventarioItem, nueva_cantidad: float):
         try:
-            
-            self.db.update_inventario_cantidad(item.id, nueva_cantidad)
+            # Se envía la diferencia: si otra terminal vendió mientras tanto, no se pierde
+            self.db.ajustar_inventario_cantidad(item.id, nueva_cantidad - item.cantidad)
             
             self.mensaje.value = f" Stock de '{item.nombre}' actualizado a {nueva_cantidad}."
             self.cargar_inventario()
         except Exception as e:
             self.mensaje.value = f"Error al actualizar: {e}"
+
+    def actualizar_costo(self, item: InventarioItem, nuevo_costo: float):
+        try:
+            self.db.update_inventario_costo(item.id, nuevo_costo)
+            self.mensaje.value = f" Costo de '{item.nombre}' actualizado a {nuevo_costo}."
+            self.cargar_inventario()
+        except Exception as e:
+            self.mensaje.value = f"Error al actualizar: {e}"
+
+    def actualizar_minimo(self, item: InventarioItem, nuevo_minimo: float):
+        try:
+            self.db.update_inventario_minimo(item.id, nuevo_minimo)
+            self.mensaje.value = f" Mínimo de '{item.nombre}' actualizado a {nuevo_minimo}."
+            self.cargar_inventario()
+        except Exception as e:
+            self.mensaje.value = f"Error al actualizar: {e}"
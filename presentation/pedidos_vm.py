@@ -1,10 +1,14 @@
-from domain.models import Plato
+import threading
+from domain.models import Cliente, Plato
 from domain.restaurante import Pedido
+from domain.recetas import recetas_por_plato, calcular_consumo_insumos, insumos_desconocidos
 from presentation.observable import Observable
 
 class PedidosViewModel:
-    def __init__(self, firestore_service, ia_service):
+    def __init__(self, firestore_service, ia_service, journal=None):
         self.db = firestore_service
+        # Diario local: si existe, la caja no espera a Firestore
+        self.journal = journal
 
         self.ia = ia_service 
         
@@ -12,13 +16,28 @@ class PedidosViewModel:
         self.cliente_actual = Observable(None)
         self.platos_menu = Observable([]) 
         self.mensaje = Observable("")
+        self.guardando = Observable(False)  # Pedido en vuelo: bloquea el botón de finalizar
+        # Tras un intento de envío el pedido queda congelado: si el envío llegó a Firestore
+        # aunque la respuesta falló, un reintento con otros ítems se perdería contra el ya guardado
+        self.envio_intentado = False
+        self.pendientes_envio = Observable((0, 0))  # (pendientes, fallidos) del diario local
         self.cantidades_temp = {} 
+        self.recetas = {}  # plato_id -> {insumo_id: cantidad}, ya convertidas a la unidad de cada insumo
+
+        if self.journal:
+            self.journal.suscribir(lambda pendientes, fallidos: setattr(self.pendientes_envio, "value", (pendientes, fallidos)))
 
     def cargar_platos(self):
         try:
             platos_list = self.db.get_platos()
             platos_list.sort(key=lambda p: p.nombre)
             self.platos_menu.value = platos_list
+            # Las recetas con unidades ("150 g") se convierten aquí, no en cada venta
+            inventario = self.db.get_inventario()
+            self.recetas = recetas_por_plato(platos_list, inventario)
+            faltantes = insumos_desconocidos(platos_list, inventario)
+            if faltantes:
+                self.mensaje.value = f"Recetas con insumos inexistentes (no se descuentan): {', '.join(faltantes)}"
         except Exception as e:
             self.mensaje.value = f"Error al cargar menú: {e}"
 
@@ -27,10 +46,19 @@ class PedidosViewModel:
             self.mensaje.value = "Faltan datos del cliente"
             return
         try:
-            cliente = self.db.get_or_create_cliente(email, nombre)
+            try:
+                cliente = self.db.get_or_create_cliente(email, nombre)
+            except Exception:
+                if not self.journal:
+                    raise
+                # Sin conexión: el ID sale del email y el cliente se crea en Firestore con la venta
+                email_norm = Cliente.normalizar_email(email)
+                cliente = Cliente(id=Cliente.id_desde_email(email_norm), nombre=nombre, email=email_norm)
             self.cliente_actual.value = cliente
-            self.pedido_actual.value = Pedido(cliente=cliente)
+            # El ID se fija aquí: cualquier reenvío del mismo pedido escribe el mismo documento
+            self.pedido_actual.value = Pedido.nuevo(cliente)
             self.cantidades_temp = {} 
+            self.envio_intentado = False
             self.mensaje.value = f"Pedido abierto para {nombre}"
         except Exception as e:
             self.mensaje.value = f"Error iniciando: {e}"
@@ -43,6 +71,13 @@ class PedidosViewModel:
         if not self.pedido_actual.value:
             self.mensaje.value = "¡Primero ingresa los datos del cliente!"
             return False
+        if self.guardando.value:
+            # El pedido se está enviando: cambiarlo ahora lo dejaría distinto de lo guardado
+            self.mensaje.value = "Guardando el pedido, espera un momento..."
+            return False
+        if self.envio_intentado:
+            self.mensaje.value = "Este pedido ya se intentó guardar: solo se puede reintentar tal cual o abrir uno nuevo."
+            return False
 
         pedido = self.pedido_actual.value
         self.cantidades_temp[plato.id] = nueva_cantidad
@@ -64,6 +99,9 @@ class PedidosViewModel:
         return True
 
     def finalizar_pedido(self):
+        if self.guardando.value:
+            return
+
         if not self.pedido_actual.value or not self.pedido_actual.value.items:
             self.mensaje.value = "El pedido está vacío."
             return
@@ -72,18 +110,32 @@ class PedidosViewModel:
             self.mensaje.value = "No hay cliente asignado."
             return
 
-        try:
-            pedido_guardar = self.pedido_actual.value
-            pedido_id = self.db.save_pedido(pedido_guardar)
-            
-            cliente_id = self.cliente_actual.value.id
-            self.db.add_pedido_to_cliente(cliente_id, pedido_id)
-            
-            self.mensaje.value = f"¡Pedido finalizado! ID: {pedido_id}"
-            
-            self.pedido_actual.value = None
-            self.cliente_actual.value = None
-            self.cantidades_temp = {}
-            
-        except Exception as e:
-            self.mensaje.value = f"Error guardando: {e}"
+        pedido_guardar = self.pedido_actual.value
+        # Insumos que consume el pedido según la receta de cada plato
+        consumo = calcular_consumo_insumos(pedido_guardar.items, self.recetas)
+
+        def run_guardar():
+            try:
+                if self.journal:
+                    # Se confirma en disco local; el envío a Firestore va en segundo plano
+                    pedido_id = self.journal.registrar(pedido_guardar, consumo)
+                else:
+                    # Pedido + historial del cliente + stock en una sola escritura atómica
+                    pedido_id = self.db.finalizar_pedido_atomico(pedido_guardar, consumo)
+                
+                self.mensaje.value = f"¡Pedido finalizado! ID: {pedido_id}"
+                
+                self.pedido_actual.value = None
+                self.cliente_actual.value = None
+                self.cantidades_temp = {}
+                self.envio_intentado = False
+                
+            except Exception as e:
+                # El pedido sigue abierto con el mismo ID y los mismos ítems: reintentar no lo duplica
+                self.mensaje.value = f"Error guardando: {e}. Reintenta sin cambiar el pedido."
+            finally:
+                self.guardando.value = False
+
+        self.guardando.value = True
+        self.envio_intentado = True
+        threading.Thread(target=run_guardar, daemon=True).start()
@@ -0,0 +1,127 @@
+import time
+import pytest
+
+exceptions = pytest.importorskip("google.api_core.exceptions")
+from data.pedidos_journal import PedidosJournal
+from domain.models import Cliente
+from domain.restaurante import Pedido
+
+class FirestoreFalso:
+    """Sustituto de FirestoreService: solo los dos métodos que usa el diario."""
+
+    def __init__(self):
+        self.lotes = []          # IDs de cada lote que llegó a hacer commit
+        self.uno_por_uno = []    # IDs enviados por finalizar_pedido_atomico
+        self.ya_enviados = set() # Pedidos que Firestore ya tiene (AlreadyExists)
+        self.rechazados = set()  # Pedidos inválidos: siempre fallan con un 4xx
+        self.error_lote = None   # Excepción forzada para el próximo lote
+
+    def finalizar_pedidos_lote(self, lote):
+        if self.error_lote:
+            error, self.error_lote = self.error_lote, None
+            raise error
+        for pedido, _ in lote:
+            if pedido.id in self.ya_enviados:
+                raise exceptions.AlreadyExists(f"pedido {pedido.id}")
+            if pedido.id in self.rechazados:
+                raise exceptions.InvalidArgument(f"pedido {pedido.id}")
+        self.lotes.append([pedido.id for pedido, _ in lote])
+
+    def finalizar_pedido_atomico(self, pedido, consumo):
+        if pedido.id in self.rechazados:
+            raise exceptions.InvalidArgument(f"pedido {pedido.id}")
+        # El servicio real trata AlreadyExists como éxito y devuelve el ID
+        self.uno_por_uno.append(pedido.id)
+        return pedido.id
+
+def _pedido(i):
+    cliente = Cliente(id=f"c{i}", nombre=f"Cliente {i}", email=f"c{i}@mail.com")
+    pedido = Pedido.nuevo(cliente)
+    pedido.agregar_item("sopa", "Sopa", 5.0, 1 + i)
+    return pedido
+
+@pytest.fixture
+def diario(tmp_path):
+    fs = FirestoreFalso()
+    return PedidosJournal(fs, ruta=str(tmp_path / "diario.db"), tam_lote=10), fs
+
+def _fila(journal, clave):
+    return journal._conn.execute(
+        "SELECT intentos, estado, proximo_intento FROM pendientes WHERE clave = ?", (clave,)).fetchone()
+
+def test_lote_se_envia_en_un_commit_y_en_orden(diario):
+    journal, fs = diario
+    pedidos = [_pedido(i) for i in range(3)]
+    ids = [journal.registrar(p) for p in pedidos]
+    journal.registrar(pedidos[0])  # Doble clic en finalizar: no se duplica
+
+    assert journal.enviar_pendientes() == 3
+    assert fs.lotes == [ids]
+    assert journal.cantidad_pendientes() == 0
+
+def test_error_de_red_deja_el_lote_para_despues(diario):
+    journal, fs = diario
+    journal.registrar(_pedido(0))
+    fs.error_lote = exceptions.ServiceUnavailable("sin red")
+
+    with pytest.raises(exceptions.ServiceUnavailable):
+        journal.enviar_pendientes()
+    assert journal.cantidad_pendientes() == 1
+
+    assert journal.enviar_pendientes() == 1
+    assert journal.cantidad_pendientes() == 0
+
+def test_pedido_invalido_se_aisla_y_el_resto_sale(diario):
+    journal, fs = diario
+    ids = [journal.registrar(_pedido(i)) for i in range(3)]
+    fs.rechazados.add(ids[1])
+
+    journal.enviar_pendientes()
+
+    assert fs.lotes == []
+    assert fs.uno_por_uno == [ids[0], ids[2]]
+    intentos, estado, proximo = _fila(journal, ids[1])
+    assert (intentos, estado) == (1, "pendiente")
+    assert proximo > time.time()  # No vuelve a salir hasta que pase su espera
+    assert journal.cantidad_pendientes() == 1
+
+def test_reintentos_con_espera_creciente_hasta_fallido(diario):
+    journal, fs = diario
+    clave = journal.registrar(_pedido(0))
+    fs.rechazados.add(clave)
+
+    esperas = []
+    for intento in range(1, PedidosJournal.MAX_INTENTOS + 1):
+        antes = time.time()
+        journal.enviar_pendientes()
+        intentos, estado, proximo = _fila(journal, clave)
+        assert intentos == intento
+        esperas.append(proximo - antes)
+        # Se adelanta el reloj del pedido para no esperar de verdad
+        journal._conn.execute("UPDATE pendientes SET proximo_intento = 0 WHERE clave = ?", (clave,))
+
+    assert esperas == sorted(esperas) and esperas[0] < esperas[-1]
+    assert estado == "fallido"
+    assert journal.cantidad_fallidos() == 1
+    assert journal.enviar_pendientes() == 0  # Un fallido ya no se reintenta
+
+def test_pedido_ya_enviado_cuenta_como_enviado(diario):
+    journal, fs = diario
+    ids = [journal.registrar(_pedido(i)) for i in range(2)]
+    # Respuesta perdida: el primer pedido ya estaba en Firestore
+    fs.ya_enviados.add(ids[0])
+
+    journal.enviar_pendientes()
+
+    assert fs.uno_por_uno == ids
+    assert journal.cantidad_pendientes() == 0
+    assert journal.cantidad_fallidos() == 0
+
+def test_oyentes_reciben_pendientes_y_fallidos(diario):
+    journal, fs = diario
+    avisos = []
+    journal.suscribir(lambda pendientes, fallidos: avisos.append((pendientes, fallidos)))
+    journal.registrar(_pedido(0))
+    journal.enviar_pendientes()
+
+    assert avisos == [(0, 0), (1, 0), (0, 0)]
@@ -0,0 +1,72 @@
+from datetime import date, datetime
+from domain.canasta import CanastaPlatos
+from domain.ventas_columnar import VentasColumnar
+
+def _pedido(i, items):
+    return {
+        "id": f"p{i}",
+        "creado_en": datetime(2026, 3, 1 + i, 12, 0),
+        "total": sum(cant * precio for _, cant, precio in items),
+        "items": [{"plato_id": plato, "nombre": plato, "cantidad": cant, "precio_unitario": precio}
+                  for plato, cant, precio in items]
+    }
+
+def test_resincronizar_no_hace_crecer_las_columnas():
+    ventas = VentasColumnar(capacidad=4)
+    pedidos = [_pedido(i, [("sopa", 1, 5.0), ("jugo", 2, 2.0)]) for i in range(5)]
+    for p in pedidos:
+        ventas.agregar(p)
+
+    # Cada sincronización vuelve a traer el pedido más nuevo
+    for _ in range(100):
+        ventas.agregar(dict(pedidos[-1]))
+
+    assert ventas.n_pedidos == 5
+    assert ventas.n_lineas == 10
+    assert ventas.ingreso_total() == 45.0
+
+def test_pedido_editado_reemplaza_sus_lineas():
+    ventas = VentasColumnar(capacidad=4)
+    ventas.agregar(_pedido(0, [("sopa", 1, 5.0)]))
+    ventas.agregar(_pedido(1, [("jugo", 1, 2.0)]))
+
+    ventas.agregar(_pedido(0, [("sopa", 2, 5.0), ("jugo", 3, 2.0)]))  # Más líneas que antes
+    ventas.agregar(_pedido(0, [("sopa", 1, 5.0)]))                    # Menos líneas
+
+    assert ventas.n_pedidos == 2
+    assert dict(ventas.top_platos(5)) == {"sopa": 1.0, "jugo": 1.0}
+    assert ventas.ingreso_total(date(2026, 3, 1), date(2026, 3, 1)) == 5.0
+
+def test_lineas_descartadas_se_compactan():
+    ventas = VentasColumnar(capacidad=4)
+    ventas.MIN_LINEAS_COMPACTAR = 4
+    for vuelta in range(1, 20):
+        ventas.agregar(_pedido(0, [("sopa", 1, 5.0)] * vuelta))
+    ventas.agregar(_pedido(1, [("jugo", 1, 2.0)]))
+    ventas.quitar("p0")
+
+    assert ventas.n_lineas <= 2 * ventas.MIN_LINEAS_COMPACTAR
+    assert dict(ventas.top_platos(5)) == {"jugo": 1.0}
+    assert ventas.recientes(5) == ["p1"]
+
+def test_recientes_respeta_el_rango():
+    ventas = VentasColumnar(capacidad=4)
+    for i in range(6):
+        ventas.agregar(_pedido(i, [("sopa", 1, 5.0)]))
+
+    assert ventas.recientes(2) == ["p5", "p4"]
+    assert ventas.recientes(2, date(2026, 3, 2), date(2026, 3, 4)) == ["p3", "p2"]
+    assert ventas.recientes(10, hasta=date(2026, 3, 2)) == ["p1", "p0"]
+
+def test_combos_solo_del_periodo():
+    ventas = VentasColumnar(capacidad=4)
+    for i in range(4):
+        ventas.agregar(_pedido(i, [("sopa", 1, 5.0), ("jugo", 1, 2.0)]))
+    for i in range(4, 8):
+        ventas.agregar(_pedido(i, [("sopa", 1, 5.0)]))
+        ventas.agregar(_pedido(i + 4, [("postre", 1, 3.0)]))
+
+    marzo = CanastaPlatos.del_periodo(ventas, date(2026, 3, 1), date(2026, 3, 4))
+    assert marzo.n_pedidos == 4
+    assert CanastaPlatos.del_periodo(ventas, date(2026, 3, 5), date(2026, 3, 12)).reglas(5) == []
+    assert [(r["antecedente"], r["consecuente"]) for r in CanastaPlatos.del_periodo(ventas).reglas(5)] == [("jugo", "sopa")]
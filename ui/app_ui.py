@@ -12,7 +12,7 @@ from ui.finanzas_view import FinanzasView
 from ui.historial_view import HistorialPedidosView
 
 class AppUI(tk.Tk):
-    def __init__(self, vm_bundle: Dict, ia_service=None): # <--- AÑADIDO ia_service
+    def __init__(self, vm_bundle: Dict, ia_service=None, planificador=None): # <--- AÑADIDO ia_service
         super().__init__()
         self.title("Sistema de Restaurante")
         self.geometry("1024x768")
@@ -23,6 +23,11 @@ class AppUI(tk.Tk):
         self.ia_service = ia_service 
         # --------------------------------------------------------------
 
+        # Cola común de IA: los trabajos de fondo solo corren si su vista está a la vista
+        self.planificador = planificador
+        if planificador:
+            planificador.vista_visible = lambda vista: self.current_frame_name == vista
+
         self.current_frame_name = None 
 
         container = ttk.Frame(self)
@@ -61,6 +66,8 @@ class AppUI(tk.Tk):
             return
 
         frame = self.frames[frame_name]
+        # Se marca como visible antes de on_show: los trabajos de IA que encola ya cuentan como de esta vista
+        self.current_frame_name = frame_name
         
         if hasattr(frame, 'on_show'):
             try:
@@ -69,7 +76,6 @@ class AppUI(tk.Tk):
                 print(f"Error en on_show de {frame_name}: {e}")
             
         frame.tkraise()
-        self.current_frame_name = frame_name
 
     def get_vm(self, vm_name: str):
         vm = self.vm_bundle.get(vm_name)
@@ -1,9 +1,10 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, scrolledtext, messagebox, simpledialog
 import threading
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from domain.periodos import PERIODOS, parsear_fecha
 
 # ======================================================
 # COMPONENTE 1: TARJETA DE MÉTRICA (KPI CARD)
@@ -34,6 +35,9 @@ class MetricCard(tk.Frame):
     def set_value(self, value):
         self.lbl_value.config(text=str(value))
 
+    def set_subtext(self, texto):
+        self.lbl_sub.config(text=str(texto))
+
 # ======================================================
 # COMPONENTE 2: WIDGET DE INSIGHT IA
 # ======================================================
@@ -92,8 +96,9 @@ class FinanzasView(ttk.Frame):
         tk.Label(f_header, text="Dashboard Financiero", font=("Segoe UI", 16, "bold"), bg="white", fg="#263238").pack(side="left", padx=10)
         
         self.period_var = tk.StringVar(value="Mes Actual")
-        ttk.Combobox(f_header, textvariable=self.period_var, values=["Mes Actual", "Última Semana", "Año Completo"], state="readonly").pack(side="right", padx=10)
-        self.period_var.trace("w", lambda *args: self.vm.generar_reporte(self.period_var.get()))
+        self.rango_personalizado = (None, None)
+        ttk.Combobox(f_header, textvariable=self.period_var, values=PERIODOS, state="readonly").pack(side="right", padx=10)
+        self.period_var.trace("w", lambda *args: self.on_periodo_change())
 
         # --- SCROLLABLE CONTENT (RESPONSIVO - SIN HUECOS) ---
         canvas = tk.Canvas(self, bg="#F5F7FA", borderwidth=0, highlightthickness=0)
@@ -164,6 +169,34 @@ class FinanzasView(ttk.Frame):
         self.canvas_pie = FigureCanvasTkAgg(self.fig_pie, master=f_chart_pie)
         self.canvas_pie.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
 
+        # Mapa de calor (pedidos por día de la semana y hora)
+        f_calor = tk.Frame(f_charts, bg="white", bd=1, relief="flat")
+        f_calor.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=10, pady=(20, 0))
+        self.var_calor = tk.StringVar(value="Pedidos")
+        f_calor_top = tk.Frame(f_calor, bg="white")
+        f_calor_top.pack(fill="x", padx=10, pady=(10, 0))
+        for opcion in ("Pedidos", "Ingreso"):
+            ttk.Radiobutton(f_calor_top, text=opcion, value=opcion, variable=self.var_calor,
+                            command=lambda: self.update_calor(self.vm.graficos_data.value)).pack(side="right", padx=5)
+
+        self.fig_calor = Figure(figsize=(9, 2.8), dpi=100)
+        self.fig_calor.patch.set_facecolor('#F5F7FA')
+        self.ax_calor = self.fig_calor.add_subplot(111)
+        self.canvas_calor = FigureCanvasTkAgg(self.fig_calor, master=f_calor)
+        self.canvas_calor.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+
+        # 3b. PRONÓSTICO
+        f_pron = ttk.LabelFrame(self.main_container, text="Pronóstico próximos 7 días (unidades)", padding=10)
+        f_pron.pack(fill="x", pady=(0, 10), padx=20)
+        self.lbl_pronostico = tk.Label(f_pron, text="Calculando...", font=("Segoe UI", 10), justify="left", anchor="w")
+        self.lbl_pronostico.pack(fill="x")
+
+        # 3c. COMBOS (platos que se piden juntos)
+        f_combos = ttk.LabelFrame(self.main_container, text="Se piden juntos (periodo)", padding=10)
+        f_combos.pack(fill="x", pady=(0, 10), padx=20)
+        self.lbl_combos = tk.Label(f_combos, text="Calculando...", font=("Segoe UI", 10), justify="left", anchor="w")
+        self.lbl_combos.pack(fill="x")
+
         # 4. TABLA
         f_table = ttk.LabelFrame(self.main_container, text="Historial Reciente", padding=10)
         f_table.pack(fill="x", pady=20, padx=20)
@@ -198,13 +231,29 @@ class FinanzasView(ttk.Frame):
         self.vm.reporte_finanzas.subscribe(lambda d: self.after(0, lambda: self.update_kpis(d)))
         self.vm.transacciones.subscribe(lambda d: self.after(0, lambda: self.update_transacciones(d)))
         self.vm.graficos_data.subscribe(lambda d: self.after(0, lambda: self.update_graficos(d)))
-        self.vm.gemini_respuesta.subscribe(lambda d: self.after(0, lambda: self.update_chat(d)))
+        self._chat_activo = None  # id de la respuesta que se está escribiendo
+        self.vm.gemini_fragmento.subscribe(lambda d: self.after(0, lambda: self.update_chat(d)))
         self.vm.insight_flash.subscribe(lambda d: self.after(0, lambda: self.update_insight_widget(d)))
+        self.vm.pronostico.subscribe(lambda d: self.after(0, lambda: self.update_pronostico(d)))
+        self.vm.combos.subscribe(lambda d: self.after(0, lambda: self.update_combos(d)))
         
         self.after(1000, self._ciclo_insights_automaticos)
 
     def on_show(self):
-        self.vm.generar_reporte_completo()
+        desde, hasta = self.rango_personalizado
+        self.vm.generar_reporte_completo(self.period_var.get(), desde, hasta)
+
+    def on_periodo_change(self):
+        if self.period_var.get() == "Personalizado":
+            try:
+                desde = simpledialog.askstring("Periodo", "Desde (AAAA-MM-DD):", parent=self)
+                hasta = simpledialog.askstring("Periodo", "Hasta (AAAA-MM-DD):", parent=self)
+                if not desde or not hasta: return
+                self.rango_personalizado = (parsear_fecha(desde), parsear_fecha(hasta))
+            except ValueError:
+                messagebox.showerror("Periodo", "Formato de fecha inválido. Use AAAA-MM-DD.")
+                return
+        self.on_show()
 
     def _ciclo_insights_automaticos(self):
         self.vm.obtener_insight_automatico()
@@ -215,9 +264,12 @@ class FinanzasView(ttk.Frame):
         if not data: return
         try:
             self.card_ingreso.set_value(f"${data.get('ingreso_bruto', 0):,.0f}")
-            self.card_neto.set_value(f"${data.get('ganancia_neta', 0):,.0f}")
+            neto = data.get('ganancia_neta')
+            # None = sin costos de insumos cargados: la ganancia no se conoce
+            self.card_neto.set_value(f"${neto:,.0f}" if neto is not None else "N/D")
             self.card_pedidos.set_value(str(data.get('total_pedidos', 0)))
             self.card_ticket.set_value(f"${data.get('ingreso_promedio', 0):,.0f}")
+            self.card_ticket.set_subtext(f"Mediana ${data.get('ticket_p50', 0):,.0f} · P90 ${data.get('ticket_p90', 0):,.0f}")
         except: pass
 
     def update_transacciones(self, transacciones):
@@ -227,7 +279,8 @@ class FinanzasView(ttk.Frame):
             try:
                 self.tree_trans.insert("", "end", values=(
                     trans.get("fecha", "-"), trans.get("pedido_id", "-"), trans.get("cliente", "-"),
-                    f"${trans.get('total', 0):,.0f}", f"${trans.get('ganancia', 0):,.0f}"
+                    f"${trans.get('total', 0):,.0f}",
+                    f"${trans['ganancia']:,.0f}" if trans.get('ganancia') is not None else "N/D"
                 ))
             except: pass
 
@@ -283,33 +336,83 @@ class FinanzasView(ttk.Frame):
             else:
                 self.ax_pie.text(0.5, 0.5, "Sin datos", ha='center')
             self.canvas_pie.draw()
+
+            # 3. MAPA DE CALOR
+            self.update_calor(data)
             
         except Exception as e:
             print(f"Error Gráficos: {e}")
 
+    def update_calor(self, data):
+        matriz = (data or {}).get("calor_ingreso" if self.var_calor.get() == "Ingreso" else "calor_pedidos")
+        self.fig_calor.clf()
+        self.ax_calor = self.fig_calor.add_subplot(111)
+        if matriz is None or not matriz.any():
+            self.ax_calor.text(0.5, 0.5, "Sin datos por hora (reconstruye los resúmenes diarios)", ha='center')
+            self.ax_calor.axis('off')
+        else:
+            img = self.ax_calor.imshow(matriz, aspect='auto', cmap='YlOrRd')
+            self.ax_calor.set_yticks(range(7))
+            self.ax_calor.set_yticklabels(["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"], fontsize=8)
+            self.ax_calor.set_xticks(range(0, 24, 2))
+            self.ax_calor.set_xticklabels([f"{h}h" for h in range(0, 24, 2)], fontsize=8)
+            self.ax_calor.set_title(f"{self.var_calor.get()} por día y hora", fontsize=10, fontweight='bold', color="#555")
+            self.fig_calor.colorbar(img, ax=self.ax_calor, fraction=0.03)
+        self.fig_calor.tight_layout()
+        self.canvas_calor.draw()
+
     def on_ask(self):
         prompt = self.ent_prompt.get().strip()
         if prompt:
             self.txt_chat.config(state='normal')
+            if self._chat_activo is not None:
+                # La respuesta anterior queda cortada: la nueva pregunta la cancela
+                self.txt_chat.insert(tk.END, " …(interrumpida)\n\n")
+                self._chat_activo = None
             self.txt_chat.insert(tk.END, f"Tú: {prompt}\n")
             self.txt_chat.config(state='disabled')
             self.ent_prompt.delete(0, 'end')
             
             # Feedback visual
             self.lbl_ia_status.config(text="IA pensando... ")
-            self.btn_send.config(state="disabled")
             
             self.vm.ask_gemini_question(prompt)
 
-    def update_chat(self, msg):
+    def update_chat(self, evento):
+        """Escribe la respuesta a medida que llega; ignora restos de respuestas canceladas."""
+        if not evento: return
+        chat_id, tipo, texto = evento
+        if tipo == "inicio":
+            self._chat_activo = chat_id
+            texto = "IA: "
+        elif chat_id != self._chat_activo:
+            return
+
         self.txt_chat.config(state='normal')
-        self.txt_chat.insert(tk.END, f"IA: {msg}\n\n")
+        self.txt_chat.insert(tk.END, texto if tipo != "fin" else "\n\n")
         self.txt_chat.see(tk.END)
         self.txt_chat.config(state='disabled')
-        
-        # Quitar feedback
-        self.lbl_ia_status.config(text="")
-        self.btn_send.config(state="normal")
+
+        if tipo == "fragmento":
+            self.lbl_ia_status.config(text="IA escribiendo... ")
+        elif tipo == "fin":
+            # Quitar feedback
+            self._chat_activo = None
+            self.lbl_ia_status.config(text="")
+
+    def update_pronostico(self, data):
+        if not data:
+            self.lbl_pronostico.config(text="Sin historial suficiente para pronosticar.")
+            return
+        self.lbl_pronostico.config(text="   ·   ".join(f"{nombre}: {cant:,.0f}" for nombre, cant in data.items()))
+
+    def update_combos(self, reglas):
+        if not reglas:
+            self.lbl_combos.config(text="Sin combinaciones frecuentes todavía.")
+            return
+        self.lbl_combos.config(text="\n".join(
+            f"{r['antecedente']} → {r['consecuente']}:  {r['confianza']:.0%} de las veces  (lift {r['lift']:.1f}, {r['pedidos']} pedidos)"
+            for r in reglas))
 
     def update_insight_widget(self, data):
         if data:
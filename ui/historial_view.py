@@ -27,6 +27,9 @@ class HistorialPedidosView(ttk.Frame):
         self.tree_pedidos.column("Cliente", width=120)
         self.tree_pedidos.column("Total", width=80)
         for c in cols: self.tree_pedidos.heading(c, text=c)
+        self.sb_pedidos = ttk.Scrollbar(f_left, orient="vertical", command=self.tree_pedidos.yview)
+        self.sb_pedidos.pack(side="right", fill="y")
+        self.tree_pedidos.configure(yscrollcommand=self.on_scroll_pedidos)
         self.tree_pedidos.pack(fill="both", expand=True)
         self.tree_pedidos.bind("<<TreeviewSelect>>", self.on_pedido_select)
 
@@ -45,22 +48,33 @@ class HistorialPedidosView(ttk.Frame):
         ttk.Button(f_btns, text="🔄 Recargar", command=self.vm.cargar_historial_pedidos).pack(side="left")
         ttk.Button(f_btns, text="🗑️ Eliminar", command=self.vm.eliminar_pedido_seleccionado).pack(side="right")
 
-        # Suscripciones
+        # Suscripciones (las páginas siguientes llegan desde un hilo: se pasan por after)
         self.vm.lista_pedidos.subscribe(self.update_pedidos)
+        self.vm.pedidos_agregados.subscribe(lambda p: self.after(0, lambda: self.agregar_pedidos(p)))
         self.vm.detalle_pedido_seleccionado.subscribe(self.update_detalle)
-        self.vm.mensaje.subscribe(lambda m: messagebox.showinfo("Info", m) if m else None)
+        self.vm.mensaje.subscribe(lambda m: self.after(0, lambda: messagebox.showinfo("Info", m)) if m else None)
 
     def on_show(self):
         self.vm.cargar_historial_pedidos()
 
     def update_pedidos(self, pedidos):
         for i in self.tree_pedidos.get_children(): self.tree_pedidos.delete(i)
-        for p in pedidos:
-            pedido_id = p.get("id")
+        self.agregar_pedidos(pedidos)
+
+    def agregar_pedidos(self, pedidos):
+        # Filas (id, cliente_nombre, total) proyectadas por el servicio
+        for pedido_id, cliente_nombre, total in pedidos:
+            if self.tree_pedidos.exists(pedido_id): continue
             self.tree_pedidos.insert("", "end", iid=pedido_id, values=(
-                str(pedido_id)[-4:], p.get("cliente_nombre", "N/A"), f"${p.get('total',0):,.0f}"
+                str(pedido_id)[-4:], cliente_nombre or "N/A", f"${total or 0:,.0f}"
             )) 
 
+    def on_scroll_pedidos(self, first, last):
+        self.sb_pedidos.set(first, last)
+        # Cerca del final: pedir la siguiente página
+        if float(last) > 0.9:
+            self.after_idle(self.vm.cargar_mas_pedidos)
+
     def on_pedido_select(self, event):
         sel = self.tree_pedidos.focus()
         if sel:
@@ -80,7 +80,15 @@ class InventarioView(ttk.Frame):
         self.unidad_var = tk.StringVar()
         ttk.Entry(f_input, textvariable=self.unidad_var, width=15).grid(row=0, column=5, padx=5, pady=5)
 
-        ttk.Button(f_input, text="➕ Crear Ítem", command=self.on_create_item).grid(row=0, column=6, padx=15, pady=5)
+        ttk.Label(f_input, text="Costo unit.:").grid(row=0, column=6, padx=5, pady=5, sticky="e")
+        self.costo_var = tk.StringVar()
+        ttk.Entry(f_input, textvariable=self.costo_var, width=12).grid(row=0, column=7, padx=5, pady=5)
+
+        ttk.Label(f_input, text="Mínimo:").grid(row=0, column=8, padx=5, pady=5, sticky="e")
+        self.minimo_var = tk.StringVar()
+        ttk.Entry(f_input, textvariable=self.minimo_var, width=10).grid(row=0, column=9, padx=5, pady=5)
+
+        ttk.Button(f_input, text="➕ Crear Ítem", command=self.on_create_item).grid(row=0, column=10, padx=15, pady=5)
 
         # Panel de Recomendación IA
         f_recom = ttk.LabelFrame(self.scrollable_frame, text="Recomendación Automática de IA", padding=10)
@@ -102,13 +110,15 @@ class InventarioView(ttk.Frame):
         self.search_var.trace("w", lambda *args: self.update_tree(self.vm.inventario_lista.value))
 
         # Tabla
-        cols = ("Nombre", "Cantidad", "Unidad")
+        cols = ("Nombre", "Cantidad", "Unidad", "Costo", "Mínimo")
         self.tree = ttk.Treeview(f_tree_container, columns=cols, show="headings", height=15)
         
         # Columnas expandibles
         self.tree.column("Nombre", width=250, anchor="w")
         self.tree.column("Cantidad", width=120, anchor="center")
         self.tree.column("Unidad", width=120, anchor="center")
+        self.tree.column("Costo", width=120, anchor="center")
+        self.tree.column("Mínimo", width=100, anchor="center")
 
         for col in cols:
             self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
@@ -121,7 +131,7 @@ class InventarioView(ttk.Frame):
 
         self.tree.bind("<Double-1>", self.on_item_double_click)
         
-        ttk.Label(self.scrollable_frame, text="* Doble click en un ítem para editar su stock", 
+        ttk.Label(self.scrollable_frame, text="* Doble click en un ítem para editar su stock (o en las columnas Costo / Mínimo para editarlas)", 
                   font=("Segoe UI", 9, "italic"), foreground="gray").pack(pady=5)
 
         # Mensajes
@@ -131,7 +141,7 @@ class InventarioView(ttk.Frame):
         # Suscripciones
         self.vm.inventario_lista.subscribe(self.update_tree)
         self.vm.mensaje.subscribe(self.show_vm_message)
-        self.vm.recomendacion.subscribe(self.update_recomendacion)
+        self.vm.recomendacion.subscribe(lambda r: self.after(0, lambda: self.update_recomendacion(r)))
 
     # --- MÉTODOS ---
     def _on_mousewheel(self, event):
@@ -143,12 +153,14 @@ class InventarioView(ttk.Frame):
         nombre = self.nombre_var.get().strip()
         cant = self.cantidad_var.get().strip()
         unidad = self.unidad_var.get().strip()
+        costo = self.costo_var.get().strip() or "0"
+        minimo = self.minimo_var.get().strip() or "0"
         if nombre and cant and unidad:
             try:
-                float(cant)
-                self.vm.crear_nuevo_item(nombre, cant, unidad)
-                self.nombre_var.set(""); self.cantidad_var.set(""); self.unidad_var.set("")
-            except ValueError: self.update_message("La cantidad debe ser un número válido.", "red")
+                float(cant); float(costo); float(minimo)
+                self.vm.crear_nuevo_item(nombre, cant, unidad, costo, minimo)
+                self.nombre_var.set(""); self.cantidad_var.set(""); self.unidad_var.set(""); self.costo_var.set(""); self.minimo_var.set("")
+            except ValueError: self.update_message("La cantidad, el costo y el mínimo deben ser números válidos.", "red")
         else: self.update_message("Todos los campos son obligatorios.", "red")
         
     def on_show(self): self.vm.cargar_inventario()
@@ -160,7 +172,7 @@ class InventarioView(ttk.Frame):
         items_list = items if items else []
         filtered_items = [item for item in items_list if not query or query in item.nombre.lower()]
         for item in filtered_items:
-            iid = self.tree.insert("", "end", values=(item.nombre, item.cantidad, item.unidad))
+            iid = self.tree.insert("", "end", values=(item.nombre, item.cantidad, item.unidad, f"${item.costo_unitario:,.0f}", item.minimo))
             self.mapa_items[iid] = item
 
     def sort_by(self, col):
@@ -171,7 +183,7 @@ class InventarioView(ttk.Frame):
         items = [(self.tree.set(iid, col), iid) for iid in children]
         reverse = self.sort_direction.get(col, False)
         self.sort_direction[col] = not reverse
-        key_func = lambda t: safe_float(t[0]) if col == "Cantidad" else (t[0].lower() if isinstance(t[0], str) else t[0])
+        key_func = lambda t: safe_float(str(t[0]).replace("$", "").replace(",", "")) if col in ("Cantidad", "Costo", "Mínimo") else (t[0].lower() if isinstance(t[0], str) else t[0])
         items.sort(key=key_func, reverse=reverse)
         for index, (val, iid) in enumerate(items): self.tree.move(iid, '', index)
 
@@ -180,6 +192,14 @@ class InventarioView(ttk.Frame):
         if not selected_iid: return
         item_obj = self.mapa_items.get(selected_iid)
         if not item_obj: return
+        if self.tree.identify_column(event.x) == "#4":
+            nuevo_costo = simpledialog.askfloat("Actualizar Costo", f"Costo unitario de '{item_obj.nombre}' (por {item_obj.unidad}):", initialvalue=item_obj.costo_unitario, minvalue=0.0)
+            if nuevo_costo is not None: self.vm.actualizar_costo(item_obj, nuevo_costo)
+            return
+        if self.tree.identify_column(event.x) == "#5":
+            nuevo_minimo = simpledialog.askfloat("Actualizar Mínimo", f"Stock mínimo de '{item_obj.nombre}' (en {item_obj.unidad}):", initialvalue=item_obj.minimo, minvalue=0.0)
+            if nuevo_minimo is not None: self.vm.actualizar_minimo(item_obj, nuevo_minimo)
+            return
         nueva_cantidad = simpledialog.askfloat("Actualizar Stock", f"Nueva cantidad para '{item_obj.nombre}':", initialvalue=item_obj.cantidad, minvalue=0.0)
         if nueva_cantidad is not None: self.vm.actualizar_stock(item_obj, nueva_cantidad)
 
@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk, ImageDraw 
 import os
-import threading
 import random 
 
 # =======================================================
@@ -193,9 +192,13 @@ class PedidosView(ttk.Frame):
         self.btn_pay = tk.Button(f_total, text="FINALIZAR PEDIDO", font=("Segoe UI", 11, "bold"), bg="#333", fg="white", cursor="hand2", state="disabled", pady=10, command=self.on_finalizar)
         self.btn_pay.pack(fill="x", padx=15, pady=10)
 
+        # Wrappers seguros para hilos (el guardado corre en segundo plano)
         self.vm.platos_menu.subscribe(self.render_menu)
-        self.vm.pedido_actual.subscribe(self.update_ticket)
-        self.vm.mensaje.subscribe(self.show_message)
+        self.vm.pedido_actual.subscribe(lambda p: self.after(0, lambda: self.update_ticket(p)))
+        self.vm.mensaje.subscribe(lambda m: self.after(0, lambda: self.show_message(m)))
+        self.vm.guardando.subscribe(lambda g: self.after(0, lambda: self.update_guardando(g)))
+        self.vm.pendientes_envio.subscribe(lambda c: self.after(0, lambda: self.update_pendientes(c)))
+        self.update_pendientes(self.vm.pendientes_envio.value)
         
         self.after(60000, self._ciclo_recomendacion_ia)
 
@@ -213,7 +216,7 @@ class PedidosView(ttk.Frame):
         self.promo_widget.actualizar_consejo(random.choice(consejos_rapidos))
         
         # 2. IA Real en segundo plano
-        threading.Thread(target=self._tarea_background_ia, daemon=True).start()
+        self._pedir_consejo_ia()
 
         # Limpieza
         for card in self.cards_map.values(): card.set_cantidad(0)
@@ -223,21 +226,21 @@ class PedidosView(ttk.Frame):
         self.ent_email.delete(0, 'end')
 
     def _ciclo_recomendacion_ia(self):
-        threading.Thread(target=self._tarea_background_ia, daemon=True).start()
+        self._pedir_consejo_ia()
         self.after(60000, self._ciclo_recomendacion_ia)
 
-    def _tarea_background_ia(self):
-        try:
-            ia_service = getattr(self.controller, 'ia_service', None)
-            if not ia_service: return
+    def _pedir_consejo_ia(self):
+        ia_service = getattr(self.controller, 'ia_service', None)
+        planificador = getattr(self.controller, 'planificador', None)
+        if not ia_service or not planificador: return
 
-            # Llamada al método corregido en ia_service
-            consejo = ia_service.obtener_consejo_productivo()
-            
-            if consejo:
-                self.after(0, lambda: self.promo_widget.actualizar_consejo(consejo))
-        except Exception as e:
-            print(f"Error hilo IA: {e}")
+        # Cola común de IA: se fusiona con un pedido igual en curso y se omite si la vista está oculta
+        planificador.enviar(ia_service.obtener_consejo_productivo, clave="consejo_productivo", vista="PedidosView",
+                            al_terminar=self._mostrar_consejo)
+
+    def _mostrar_consejo(self, consejo):
+        if consejo:
+            self.after(0, lambda: self.promo_widget.actualizar_consejo(consejo))
 
     # SETUP Y EVENTOS
     def _setup_header(self):
@@ -250,6 +253,9 @@ class PedidosView(ttk.Frame):
         tk.Label(f_head, text="Email:", bg="white").pack(side="left", padx=5)
         self.ent_email = ttk.Entry(f_head, width=20); self.ent_email.pack(side="left")
         tk.Button(f_head, text="▶ Iniciar", bg="#007bff", fg="white", bd=0, command=self.iniciar_pedido).pack(side="left", padx=10)
+        # Pedidos guardados en el diario local que aún no llegan a Firestore
+        self.lbl_pendientes = tk.Label(f_head, text="", bg="white", font=("Segoe UI", 9))
+        self.lbl_pendientes.pack(side="right", padx=15)
 
     def iniciar_pedido(self): self.vm.iniciar_nuevo_pedido(self.ent_email.get(), self.ent_nombre.get())
 
@@ -270,20 +276,38 @@ class PedidosView(ttk.Frame):
 
     def handle_qty_change(self, plato, cantidad):
         success = self.vm.actualizar_cantidad_plato(plato, cantidad)
-        if not success and plato.id in self.cards_map: self.cards_map[plato.id].set_cantidad(0)
+        if not success and plato.id in self.cards_map: self.cards_map[plato.id].set_cantidad(self.vm.cantidades_temp.get(plato.id, 0))
 
     def update_ticket(self, pedido):
         self.tree.delete(*self.tree.get_children())
+        if not pedido:
+            for card in self.cards_map.values(): card.set_cantidad(0)
         if not pedido or not pedido.items:
             self.lbl_total.config(text="$0.00"); self.btn_pay.config(state="disabled", bg="#555"); return
         for item in pedido.items:
             sub = item['cantidad'] * item['precio_unitario']
             self.tree.insert("", "end", values=(item['cantidad'], item['nombre'], f"${sub:,.0f}"))
-        self.lbl_total.config(text=f"${pedido.total:,.0f}"); self.btn_pay.config(state="normal", bg="#212121")
+        self.lbl_total.config(text=f"${pedido.total:,.0f}")
+        if not self.vm.guardando.value: self.btn_pay.config(state="normal", bg="#212121")
+
+    def update_guardando(self, guardando):
+        if guardando:
+            self.btn_pay.config(state="disabled", text="GUARDANDO...", bg="#555")
+        else:
+            self.btn_pay.config(text="FINALIZAR PEDIDO")
+            self.update_ticket(self.vm.pedido_actual.value)
+
+    def update_pendientes(self, conteo):
+        pendientes, fallidos = conteo
+        if fallidos:
+            self.lbl_pendientes.config(text=f"⚠ {fallidos} pedidos rechazados · {pendientes} por enviar", fg="#c62828")
+        elif pendientes:
+            self.lbl_pendientes.config(text=f"⏳ {pendientes} pedidos por enviar", fg="#ef6c00")
+        else:
+            self.lbl_pendientes.config(text="✔ Todo enviado", fg="#2e7d32")
 
     def on_finalizar(self):
         self.vm.finalizar_pedido()
-        for card in self.cards_map.values(): card.set_cantidad(0)
 
     def show_message(self, msg):
         if msg: messagebox.showinfo("Sistema", msg)
\ No newline at end of file